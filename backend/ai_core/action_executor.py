@@ -4,16 +4,21 @@ import subprocess
 import sys
 import webbrowser
 import os
-import json
 from dotenv import load_dotenv
-from thefuzz import process as fuzzy_process
 import datetime
 import time
-import pyautogui
-from PIL import ImageGrab
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# pyautogui/ImageGrab gagal diimpor tanpa display (server headless, benchmark); aksi UI lalu melapor gagal.
+try:
+    import pyautogui
+    from PIL import ImageGrab
+except Exception:
+    pyautogui, ImageGrab = None, None
 
 if sys.platform == "win32":
-    import winreg
     from ctypes import cast, POINTER
     from comtypes import CLSCTX_ALL
     from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
@@ -26,63 +31,70 @@ try:
 except ImportError:
     gw, spotipy, genai = None, None, None
 
+from ai_core import telemetry
+from ai_core.app_index import AppIndex
+from ai_core.llm_client import LLMClient, GeminiClient
+from ai_core.response_cache import ResponseCache, cache_from_env, is_cacheable
+
 load_dotenv()
 
+# Batas waktu menunggu jendela browser siap sebelum mengetik URL.
+WINDOW_READY_TIMEOUT = float(os.getenv("WINDOW_READY_TIMEOUT", "10"))
+NEW_TAB_TIMEOUT = float(os.getenv("NEW_TAB_TIMEOUT", "2"))
+# Rencana multi-langkah: batas jumlah langkah dan langkah yang boleh berjalan bersamaan.
+MAX_PLAN_STEPS = int(os.getenv("MAX_PLAN_STEPS", "8"))
+PLAN_MAX_WORKERS = int(os.getenv("PLAN_MAX_WORKERS", "4"))
+# Aksi yang mengetik/menekan tombol berebut fokus jendela, jadi tidak pernah dijalankan bersamaan.
+UI_ACTIONS = {"navigate_browser", "new_tab_and_navigate"}
+
+
+def wait_until(predicate, timeout: float, interval: float = 0.1) -> bool:
+    """Memeriksa predicate berulang kali sampai benar atau batas waktu habis."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if predicate():
+                return True
+        except Exception:
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def _active_window_title() -> str:
+    window = gw.getActiveWindow()
+    return window.title if window is not None else ""
+
 class ActionExecutor:
-    def __init__(self):
-        self.app_index_path = "app_index.json"
-        self.app_index = self._load_or_create_app_index()
+    def __init__(self, llm_client: LLMClient = None, answer_cache: ResponseCache = None):
+        self.llm = llm_client
+        self.answer_cache = answer_cache if answer_cache is not None else cache_from_env("llm_answers.json")
+        self.app_index = AppIndex("app_index.json")
+        self.ui_lock = threading.RLock()
+        self._plan_pool = ThreadPoolExecutor(max_workers=PLAN_MAX_WORKERS, thread_name_prefix="plan-step")
         print("Action Executor siap dengan indeks aplikasi, kontrol OS, dan otomatisasi browser.")
 
-    def _load_or_create_app_index(self):
-        if os.path.exists(self.app_index_path):
-            with open(self.app_index_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        else:
-            return self.rebuild_app_index()
-
-    def rebuild_app_index(self):
-        index = {}
-        if sys.platform == "win32":
-            uninstall_keys = [
-                r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
-                r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
-            ]
-            for key_path in uninstall_keys:
-                try:
-                    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
-                        for i in range(winreg.QueryInfoKey(key)[0]):
-                            sub_key_name = winreg.EnumKey(key, i)
-                            with winreg.OpenKey(key, sub_key_name) as sub_key:
-                                try:
-                                    display_name = winreg.QueryValueEx(sub_key, "DisplayName")[0]
-                                    install_location = winreg.QueryValueEx(sub_key, "InstallLocation")[0]
-                                    if install_location and os.path.isdir(install_location):
-                                        for file in os.listdir(install_location):
-                                            if file.endswith(".exe") and "uninstall" not in file.lower():
-                                                app_name_lower = display_name.lower()
-                                                if app_name_lower not in index:
-                                                    index[app_name_lower] = os.path.join(install_location, file)
-                                                    break
-                                except (FileNotFoundError, OSError):
-                                    continue
-                except FileNotFoundError:
-                    continue
-        
-        common_apps = {"notepad": "notepad.exe", "calculator": "calc.exe", "paint": "mspaint.exe"}
-        index.update(common_apps)
-
-        with open(self.app_index_path, 'w', encoding='utf-8') as f:
-            json.dump(index, f, indent=4)
-        print(f"Indeks aplikasi berhasil dibangun dengan {len(index)} entri.")
-        return index
-
     def execute(self, action_object: dict) -> str:
+        return self.run(action_object)[0]
+
+    def run(self, action_object: dict) -> tuple:
+        """Menjalankan aksi dan mengembalikan (pesan untuk dibacakan, berhasil)."""
+        action_type = action_object.get("action")
+        telemetry.count_event("action", action_type or "")
+        with telemetry.stage("action", action=action_type) as span:
+            message, ok = self._dispatch(action_object)
+            span["ok"] = ok
+        return message, ok
+
+    def _dispatch(self, action_object: dict) -> tuple:
         action_type = action_object.get("action")
         parameters = action_object.get("parameters", {})
 
         if action_type == "information_retrieval":
             return self._get_gemini_answer(parameters.get("question"))
+        if action_type == "plan":
+            return self._execute_plan(parameters.get("steps"))
 
         if action_type == "open_app":
             return self._open_application(parameters.get("app_name"))
@@ -99,67 +111,169 @@ class ActionExecutor:
         elif action_type == "new_tab_and_navigate":
             return self._new_tab_and_navigate(parameters.get("url"))
         elif action_type == "rebuild_index":
-            self.app_index = self.rebuild_app_index()
-            return "Indeks aplikasi telah berhasil diperbarui."
+            self.app_index.rebuild()
+            return "Indeks aplikasi telah berhasil diperbarui.", True
         else:
-            return f"Tindakan '{action_type}' tidak dikenali atau tidak dapat dieksekusi."
+            return f"Tindakan '{action_type}' tidak dikenali atau tidak dapat dieksekusi.", False
 
-    def _open_application(self, app_name: str) -> str:
-        if not app_name: return "Nama aplikasi tidak disebutkan."
-        app_name_lower = app_name.lower()
-        exact_match = self.app_index.get(app_name_lower)
-        if exact_match and os.path.exists(exact_match):
-            try:
-                subprocess.Popen([exact_match])
-                return f"Berhasil membuka {app_name}."
-            except Exception as e:
-                return f"Menemukan aplikasi, tapi gagal membukanya: {e}"
-        best_match_tuple = fuzzy_process.extractOne(app_name_lower, self.app_index.keys(), score_cutoff=75)
-        if best_match_tuple:
-            match_name, score = best_match_tuple
-            app_path = self.app_index[match_name]
+    def _validate_plan(self, steps):
+        """Mengembalikan (langkah, None) bila rencana valid, atau (None, pesan kesalahan)."""
+        if not isinstance(steps, list) or not steps:
+            return None, "Rencana tindakan kosong."
+        if len(steps) > MAX_PLAN_STEPS:
+            return None, f"Rencana terlalu panjang; maksimal {MAX_PLAN_STEPS} langkah."
+        if not all(isinstance(step, dict) for step in steps):
+            return None, "Rencana tindakan berisi langkah yang tidak valid."
+        ids = [step.get("id") for step in steps]
+        if len(set(ids)) != len(ids):
+            return None, "Rencana tindakan memiliki id langkah ganda."
+        for step in steps:
+            if step.get("action") in (None, "plan"):
+                return None, "Rencana tindakan berisi langkah yang tidak valid."
+            unknown = [dep for dep in step.get("depends_on", []) if dep not in ids]
+            if unknown:
+                return None, f"Langkah {step['id']} bergantung pada langkah yang tidak ada: {', '.join(unknown)}."
+        # Urutan topologis (Kahn); sisa langkah berarti ada siklus ketergantungan.
+        remaining = {step["id"]: set(step.get("depends_on", [])) for step in steps}
+        while remaining:
+            ready = [step_id for step_id, deps in remaining.items() if not deps]
+            if not ready:
+                return None, "Rencana tindakan memiliki ketergantungan melingkar."
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return steps, None
+
+    def _execute_plan(self, steps) -> tuple:
+        """Menjalankan langkah yang tidak saling bergantung secara bersamaan, sisanya berurutan.
+
+        Langkah yang bergantung pada langkah gagal dilewati. Hasil digabung sesuai urutan rencana
+        menjadi satu jawaban yang bisa dibacakan.
+        """
+        plan, error = self._validate_plan(steps)
+        if error:
+            return error, False
+
+        results, succeeded = {}, {}
+        pending = {step["id"]: step for step in plan}
+        running = {}
+        while pending or running:
+            changed = True
+            while changed:
+                changed = False
+                for step_id, step in list(pending.items()):
+                    deps = step.get("depends_on", [])
+                    if any(succeeded.get(dep) is False for dep in deps):
+                        results[step_id] = f"Langkah {step['action']} dilewati karena langkah sebelumnya gagal."
+                        succeeded[step_id] = False
+                    elif all(succeeded.get(dep) for dep in deps):
+                        # Konteks disalin per langkah supaya span tiap aksi masuk ke trace giliran ini.
+                        context = contextvars.copy_context()
+                        running[self._plan_pool.submit(context.run, self._run_plan_step, step)] = step_id
+                    else:
+                        continue
+                    del pending[step_id]
+                    changed = True
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step_id = running.pop(future)
+                results[step_id], succeeded[step_id] = future.result()
+        return " ".join(results[step["id"]] for step in plan), all(succeeded.values())
+
+    def _run_plan_step(self, step: dict):
+        action_object = {"action": step["action"], "parameters": step.get("parameters", {})}
+        try:
+            if step["action"] in UI_ACTIONS:
+                with self.ui_lock:
+                    return self.run(action_object)
+            return self.run(action_object)
+        except Exception as e:
+            return f"Gagal menjalankan {step['action']}: {e}", False
+
+    def _get_gemini_answer(self, question: str) -> tuple:
+        if not question: return "Pertanyaan tidak disebutkan.", False
+
+        cacheable = is_cacheable(question)
+        cache_key = ResponseCache.make_key(question, namespace="answer")
+        if not cacheable:
+            self.answer_cache.note_bypass()
+        else:
+            cached_answer = self.answer_cache.get(cache_key)
+            if cached_answer is not None:
+                return cached_answer, True
+
+        if self.llm is None:
+            if genai is None:
+                return "Fitur tanya-jawab tidak tersedia karena modul Gemini tidak terpasang.", False
+            self.llm = GeminiClient('models/gemini-2.5-pro')
+        prompt = (
+            "Jawab pertanyaan berikut dalam Bahasa Indonesia secara ringkas dan jelas, "
+            "maksimal empat kalimat, tanpa format markdown karena jawaban akan dibacakan.\n\n"
+            f"Pertanyaan: {question}"
+        )
+        try:
+            with telemetry.stage("llm", purpose="answer"):
+                answer = self.llm.generate(prompt).strip()
+        except Exception as e:
+            return f"Gagal mendapatkan jawaban: {e}", False
+
+        if answer and cacheable:
+            self.answer_cache.put(cache_key, answer)
+        return answer, bool(answer)
+
+    def _open_application(self, app_name: str) -> tuple:
+        if not app_name: return "Nama aplikasi tidak disebutkan.", False
+        match = self.app_index.lookup(app_name)
+        if match:
+            match_name, command, score = match
             try:
-                subprocess.Popen([app_path])
-                return f"Membuka '{match_name}'."
+                subprocess.Popen(command)
+                if score == 100:
+                    return f"Berhasil membuka {app_name}.", True
+                return f"Membuka '{match_name}'.", True
             except Exception as e:
-                return f"Menemukan aplikasi '{match_name}', tapi gagal membukanya: {e}"
-        return f"Maaf, saya tidak dapat menemukan aplikasi yang cocok dengan '{app_name}' di sistem Anda."
+                return f"Menemukan aplikasi '{match_name}', tapi gagal membukanya: {e}", False
+        return f"Maaf, saya tidak dapat menemukan aplikasi yang cocok dengan '{app_name}' di sistem Anda.", False
 
-    def _search_web(self, query: str) -> str:
-        if not query: return "Query pencarian tidak disebutkan."
+    def _search_web(self, query: str) -> tuple:
+        if not query: return "Query pencarian tidak disebutkan.", False
         try:
             url = f"https://www.google.com/search?q={query}"
             webbrowser.open(url)
-            return f"Mencari '{query}' di web."
+            return f"Mencari '{query}' di web.", True
         except Exception as e:
-            return f"Gagal melakukan pencarian di web: {e}"
+            return f"Gagal melakukan pencarian di web: {e}", False
 
-    def _set_volume(self, level: int) -> str:
-        if level is None: return "Harap sebutkan level volume antara 0 dan 100."
-        if not (0 <= level <= 100): return "Level volume harus antara 0 dan 100."
-        if sys.platform != "win32": return "Kontrol volume saat ini hanya didukung di Windows."
+    def _set_volume(self, level: int) -> tuple:
+        if level is None: return "Harap sebutkan level volume antara 0 dan 100.", False
+        if not (0 <= level <= 100): return "Level volume harus antara 0 dan 100.", False
+        if sys.platform != "win32": return "Kontrol volume saat ini hanya didukung di Windows.", False
         try:
             devices = AudioUtilities.GetSpeakers()
             interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
             volume = cast(interface, POINTER(IAudioEndpointVolume))
             volume.SetMasterVolumeLevelScalar(level / 100, None)
-            return f"Volume sistem diatur ke {level}%."
+            return f"Volume sistem diatur ke {level}%.", True
         except Exception as e:
-            return f"Gagal mengatur volume: {e}"
+            return f"Gagal mengatur volume: {e}", False
 
-    def _mute_volume(self, mute: bool) -> str:
-        if sys.platform != "win32": return "Kontrol mute saat ini hanya didukung di Windows."
+    def _mute_volume(self, mute: bool) -> tuple:
+        if sys.platform != "win32": return "Kontrol mute saat ini hanya didukung di Windows.", False
         try:
             devices = AudioUtilities.GetSpeakers()
             interface = devices.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
             volume = cast(interface, POINTER(IAudioEndpointVolume))
             volume.SetMute(1 if mute else 0, None)
             status = "dimatikan" if mute else "dinyalakan kembali"
-            return f"Suara sistem telah {status}."
+            return f"Suara sistem telah {status}.", True
         except Exception as e:
-            return f"Gagal mengubah status mute: {e}"
+            return f"Gagal mengubah status mute: {e}", False
 
-    def _take_screenshot(self, path: str = None) -> str:
+    def _take_screenshot(self, path: str = None) -> tuple:
+        if ImageGrab is None: return "Gagal mengambil tangkapan layar: tidak ada display yang tersedia.", False
         try:
             screenshot = ImageGrab.grab()
             if path:
@@ -172,38 +286,70 @@ class ActionExecutor:
                 timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
                 save_path = os.path.join(desktop, f"screenshot_{timestamp}.png")
             screenshot.save(save_path)
-            return f"Tangkapan layar berhasil disimpan di {save_path}"
+            return f"Tangkapan layar berhasil disimpan di {save_path}", True
         except Exception as e:
-            return f"Gagal mengambil tangkapan layar: {e}"
-
-    def _navigate_browser(self, browser: str, url: str) -> str:
-        if not browser or not url: return "Perlu nama browser dan URL untuk navigasi."
-        open_status = self._open_application(browser)
-        if "gagal" in open_status.lower() or "tidak dapat menemukan" in open_status.lower():
-            return f"Gagal membuka browser {browser}."
-        time.sleep(3)
+            return f"Gagal mengambil tangkapan layar: {e}", False
+
+    def _wait_for_window(self, keyword: str, timeout: float) -> bool:
+        tokens = [t for t in keyword.lower().split() if len(t) > 2] or [keyword.lower()]
+        return wait_until(lambda: any(t in _active_window_title().lower() for t in tokens), timeout)
+
+    def _navigate_browser(self, browser: str, url: str) -> tuple:
+        if not browser or not url: return "Perlu nama browser dan URL untuk navigasi.", False
+        if pyautogui is None: return "Gagal mengontrol browser: tidak ada display yang tersedia.", False
+        _, opened = self._open_application(browser)
+        if not opened:
+            return f"Gagal membuka browser {browser}.", False
+        if gw is None:
+            time.sleep(3)
+        elif not self._wait_for_window(browser, WINDOW_READY_TIMEOUT):
+            return f"Browser {browser} tidak siap dalam {WINDOW_READY_TIMEOUT:.0f} detik.", False
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
         try:
             pyautogui.write(url)
             pyautogui.press('enter')
-            return f"Membuka {browser} dan menavigasi ke {url}."
+            return f"Membuka {browser} dan menavigasi ke {url}.", True
         except Exception as e:
-            return f"Gagal mengontrol browser: {e}"
+            return f"Gagal mengontrol browser: {e}", False
 
-    def _new_tab_and_navigate(self, url: str) -> str:
-        if not url: return "Perlu URL untuk membuka tab baru."
+    def _new_tab_and_navigate(self, url: str) -> tuple:
+        if not url: return "Perlu URL untuk membuka tab baru.", False
+        if pyautogui is None: return "Gagal membuka tab baru: tidak ada display yang tersedia.", False
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
         try:
-            time.sleep(0.5)
+            if gw is None:
+                time.sleep(0.5)
+                title_before = None
+            else:
+                wait_until(lambda: bool(_active_window_title()), NEW_TAB_TIMEOUT)
+                title_before = _active_window_title()
             if sys.platform == "darwin":
                 pyautogui.hotkey('command', 't')
             else:
                 pyautogui.hotkey('ctrl', 't')
-            time.sleep(1)
+            if title_before is None:
+                time.sleep(1)
+            else:
+                # Judul jendela berganti begitu tab baru aktif.
+                wait_until(lambda: _active_window_title() != title_before, NEW_TAB_TIMEOUT, interval=0.05)
             pyautogui.write(url)
             pyautogui.press('enter')
-            return f"Membuka tab baru dan menavigasi ke {url}."
+            return f"Membuka tab baru dan menavigasi ke {url}.", True
         except Exception as e:
-            return f"Gagal membuka tab baru: {e}"
\ No newline at end of file
+            return f"Gagal membuka tab baru: {e}", False
+
+    def describe_pending(self, action_object: dict) -> str:
+        """Kalimat yang bisa langsung diucapkan selagi aksi panjang berjalan di latar belakang."""
+        action_type = action_object.get("action")
+        parameters = action_object.get("parameters", {})
+        if action_type == "navigate_browser":
+            return f"Baik, membuka {parameters.get('browser')} ke {parameters.get('url')}."
+        if action_type == "new_tab_and_navigate":
+            return f"Baik, membuka tab baru ke {parameters.get('url')}."
+        if action_type == "rebuild_index":
+            return "Baik, indeks aplikasi sedang diperbarui."
+        if action_type == "plan":
+            return f"Baik, menjalankan {len(parameters.get('steps') or [])} langkah."
+        return "Baik, sedang diproses."
@@ -0,0 +1,84 @@
+# backend/ai_core/action_jobs.py
+
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Aksi yang mengendalikan UI atau berjalan lama; dieksekusi di latar belakang.
+DEFERRED_ACTIONS = {"navigate_browser", "new_tab_and_navigate", "rebuild_index"}
+
+
+class ActionJobQueue:
+    """Antrean pekerjaan untuk aksi panjang: job id dikembalikan seketika, hasil bisa dipantau."""
+
+    def __init__(self, executor, max_workers: int = 2, max_history: int = 200):
+        self.executor = executor
+        self.max_history = max_history
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="action-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        # Aksi UI saling berebut fokus keyboard/jendela, jadi dijalankan bergantian; kunci dibagi
+        # dengan executor supaya langkah UI dalam rencana juga ikut antre.
+        self._ui_lock = getattr(executor, "ui_lock", None) or threading.Lock()
+
+    def should_defer(self, action_object: dict) -> bool:
+        if action_object.get("action") == "plan":
+            # Rencana yang memuat aksi panjang dijalankan utuh di latar belakang.
+            steps = action_object.get("parameters", {}).get("steps") or []
+            return any(step.get("action") in DEFERRED_ACTIONS for step in steps if isinstance(step, dict))
+        return action_object.get("action") in DEFERRED_ACTIONS
+
+    def submit(self, action_object: dict, callback=None) -> dict:
+        job = {
+            "id": uuid.uuid4().hex,
+            "action": action_object,
+            "status": "queued",
+            "result": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > self.max_history:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest["status"] in ("queued", "running"):
+                    break
+                del self._jobs[oldest_id]
+        self._pool.submit(self._run, job, callback)
+        return dict(job)
+
+    def _run(self, job: dict, callback):
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        try:
+            if job["action"].get("action") in ("navigate_browser", "new_tab_and_navigate"):
+                with self._ui_lock:
+                    message, ok = self.executor.run(job["action"])
+            else:
+                message, ok = self.executor.run(job["action"])
+            job["result"] = message
+            job["status"] = "done" if ok else "failed"
+        except Exception as e:
+            job["result"] = f"Gagal menjalankan aksi: {e}"
+            job["status"] = "failed"
+        job["finished_at"] = time.time()
+        if callback is not None:
+            try:
+                callback(dict(job))
+            except Exception as e:
+                print(f"Callback job {job['id']} gagal: {e}")
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self) -> list:
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
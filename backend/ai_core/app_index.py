@@ -0,0 +1,341 @@
+# backend/ai_core/app_index.py
+
+import os
+import re
+import sys
+import json
+import shlex
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from thefuzz import fuzz
+
+if sys.platform == "win32":
+    import winreg
+
+INDEX_VERSION = 4
+UNINSTALL_KEYS = [
+    r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall",
+    r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
+]
+COMMON_WINDOWS_APPS = {"notepad": "notepad.exe", "calculator": "calc.exe", "paint": "mspaint.exe"}
+DESKTOP_DIRS = [
+    "/usr/share/applications",
+    "/usr/local/share/applications",
+    "/var/lib/flatpak/exports/share/applications",
+    "/var/lib/snapd/desktop/applications",
+    os.path.expanduser("~/.local/share/applications"),
+    os.path.expanduser("~/.local/share/flatpak/exports/share/applications"),
+]
+# Entri $PATH hanya cocok bila namanya disebut persis (tanpa fuzzy); daftar ini lapisan tambahan untuk
+# perintah yang tetap tidak boleh dijalankan lewat suara meski disebut persis.
+PATH_DENYLIST = {
+    "shutdown", "reboot", "halt", "poweroff", "init", "telinit", "systemctl", "loginctl", "rm", "rmdir", "dd",
+    "shred", "kill", "killall", "killall5", "pkill", "skill", "xkill", "sudo", "su", "doas", "pkexec", "runas",
+    "format", "del", "diskpart", "fdisk", "parted", "wipefs", "mkfs", "logoff", "logout", "tsdiscon", "tskill",
+    "taskkill", "rundll32", "bcdedit", "cipher", "vssadmin", "wbadmin", "reg", "regedit", "sfc", "chkdsk",
+}
+
+# Peluncur/pembungkus umum di Exec= (mis. "flatpak run ...", "env VAR=1 app"); nama programnya tidak
+# mewakili aplikasi, jadi tidak dijadikan alias agar "buka flatpak" tidak membuka aplikasi acak.
+LAUNCHER_STEMS = {
+    "env", "sh", "bash", "dash", "zsh", "flatpak", "snap", "gtk-launch", "xdg-open", "exo-open", "gio",
+    "kioclient", "kioclient5", "dbus-launch", "sudo", "pkexec", "nice", "ionice", "taskset", "nohup", "setsid",
+    "prime-run", "primusrun", "optirun", "gamemoderun", "python", "python3", "java", "mono", "wine", "cmd", "start",
+}
+
+_VERSION_NOISE = re.compile(r"\([^)]*\)|\bv?\d+(?:\.\d+)+\b|\b(?:x64|x86|64-bit|32-bit)\b")
+_TOKEN = re.compile(r"[a-z0-9]+")
+_DESKTOP_FIELD_CODE = re.compile(r"%[fFuUdDnNickvm]")
+
+
+def _tokens(text: str) -> list:
+    return _TOKEN.findall(text.lower())
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {' '.join(_tokens(text))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _aliases(name: str, command: list) -> list:
+    aliases = set()
+    cleaned = " ".join(_VERSION_NOISE.sub(" ", name.lower()).split())
+    if cleaned and cleaned != name:
+        aliases.add(cleaned)
+    if command:
+        stem = os.path.splitext(os.path.basename(command[0]))[0].lower()
+        if stem and stem != name and stem not in LAUNCHER_STEMS:
+            aliases.add(stem)
+    return sorted(aliases)
+
+
+def _entry(name: str, command: list, source: str) -> list:
+    name = name.strip().lower()
+    return [name, command, _aliases(name, command), source]
+
+
+def _scan_registry_subkey(root_path: str, sub_key_name: str) -> list:
+    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, root_path) as key:
+        with winreg.OpenKey(key, sub_key_name) as sub_key:
+            try:
+                display_name = winreg.QueryValueEx(sub_key, "DisplayName")[0]
+                install_location = winreg.QueryValueEx(sub_key, "InstallLocation")[0]
+            except (FileNotFoundError, OSError):
+                return []
+    if not display_name or not install_location or not os.path.isdir(install_location):
+        return []
+    try:
+        files = os.listdir(install_location)
+    except OSError:
+        return []
+    for file in files:
+        if file.lower().endswith(".exe") and "uninstall" not in file.lower():
+            return [_entry(display_name, [os.path.join(install_location, file)], "registry")]
+    return []
+
+
+def _parse_desktop_file(path: str) -> list:
+    fields = {}
+    in_main_section = False
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("["):
+                    in_main_section = line == "[Desktop Entry]"
+                    continue
+                if in_main_section and "=" in line:
+                    key, value = line.split("=", 1)
+                    fields.setdefault(key.strip(), value.strip())
+    except OSError:
+        return []
+    if fields.get("Type", "Application") != "Application":
+        return []
+    if fields.get("NoDisplay") == "true" or fields.get("Hidden") == "true" or "Exec" not in fields:
+        return []
+    try:
+        command = shlex.split(_DESKTOP_FIELD_CODE.sub("", fields["Exec"]))
+    except ValueError:
+        return []
+    if not command or not fields.get("Name"):
+        return []
+    return [_entry(fields["Name"], command, "desktop")]
+
+
+def _scan_desktop_dir(directory: str) -> list:
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".desktop"):
+            entries.extend(_parse_desktop_file(os.path.join(directory, name)))
+    return entries
+
+
+def _scan_path_dir(directory: str) -> list:
+    entries = []
+    is_windows = sys.platform == "win32"
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if is_windows:
+            if not name.lower().endswith(".exe"):
+                continue
+            name = name[:-4]
+        elif not os.access(path, os.X_OK) or os.path.isdir(path):
+            continue
+        if name.lower() in PATH_DENYLIST or name.lower().startswith("mkfs"):
+            continue
+        entries.append([name.lower(), [path], [], "path"])
+    return entries
+
+
+def _dir_mtime(directory: str):
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+class AppIndex:
+    """Indeks aplikasi terpasang dengan indeks token/trigram untuk pencarian fuzzy yang cepat.
+
+    Sumber dipecah menjadi unit (subkey registry, direktori .desktop, direktori $PATH). Unit yang
+    waktu modifikasinya tidak berubah dipakai ulang dari file indeks; sisanya dipindai paralel.
+    """
+
+    def __init__(self, index_path: str = "app_index.json", scan_path: bool = True, max_workers: int = 8):
+        self.index_path = index_path
+        self.scan_path = scan_path
+        self.max_workers = max_workers
+        self._units = {}
+        self._lock = threading.Lock()
+        self._build_lookup([])
+        if not self._load():
+            self.rebuild()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return False
+        # Format lama {nama: path} tidak menyimpan informasi unit, jadi dibangun ulang.
+        if stored.get("version") != INDEX_VERSION:
+            return False
+        self._units = stored["units"]
+        self._build_lookup(self._merged_entries())
+        return True
+
+    def _save(self):
+        payload = {"version": INDEX_VERSION, "units": self._units}
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.index_path)
+
+    def _discover_units(self) -> list:
+        """Mengembalikan [(unit_id, mtime, loader)] untuk semua sumber di platform ini."""
+        units = []
+        if sys.platform == "win32":
+            for root_path in UNINSTALL_KEYS:
+                try:
+                    with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, root_path) as key:
+                        for i in range(winreg.QueryInfoKey(key)[0]):
+                            sub_key_name = winreg.EnumKey(key, i)
+                            try:
+                                with winreg.OpenKey(key, sub_key_name) as sub_key:
+                                    last_write = winreg.QueryInfoKey(sub_key)[2]
+                            except OSError:
+                                continue
+                            units.append((
+                                f"reg:{root_path}\\{sub_key_name}",
+                                last_write,
+                                lambda r=root_path, s=sub_key_name: _scan_registry_subkey(r, s)
+                            ))
+                except FileNotFoundError:
+                    continue
+            units.append(("builtin:windows", 0, lambda: [_entry(n, [p], "builtin") for n, p in COMMON_WINDOWS_APPS.items()]))
+        else:
+            for directory in DESKTOP_DIRS:
+                mtime = _dir_mtime(directory)
+                if mtime is not None:
+                    units.append((f"desktop:{directory}", mtime, lambda d=directory: _scan_desktop_dir(d)))
+
+        if self.scan_path:
+            seen = set()
+            for directory in os.getenv("PATH", "").split(os.pathsep):
+                directory = os.path.abspath(directory) if directory else ""
+                if not directory or directory in seen:
+                    continue
+                seen.add(directory)
+                mtime = _dir_mtime(directory)
+                if mtime is not None:
+                    units.append((f"path:{directory}", mtime, lambda d=directory: _scan_path_dir(d)))
+        return units
+
+    def rebuild(self, force: bool = False) -> dict:
+        """Memindai ulang hanya unit yang berubah; `force` memindai ulang semuanya."""
+        discovered = self._discover_units()
+        fresh_units = {}
+        pending = []
+        for unit_id, mtime, loader in discovered:
+            previous = self._units.get(unit_id)
+            if not force and previous is not None and previous["mtime"] == mtime:
+                fresh_units[unit_id] = previous
+            else:
+                pending.append((unit_id, mtime, loader))
+
+        def run(job):
+            unit_id, mtime, loader = job
+            try:
+                return unit_id, mtime, loader()
+            except OSError:
+                return unit_id, mtime, []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for unit_id, mtime, entries in pool.map(run, pending):
+                fresh_units[unit_id] = {"mtime": mtime, "entries": entries}
+
+        with self._lock:
+            self._units = fresh_units
+            self._build_lookup(self._merged_entries())
+        try:
+            self._save()
+        except OSError as e:
+            print(f"Gagal menyimpan indeks aplikasi: {e}")
+        print(f"Indeks aplikasi berhasil dibangun dengan {len(self._entries)} entri "
+              f"({len(pending)} dari {len(discovered)} sumber dipindai ulang).")
+        return {"entries": len(self._entries), "rescanned": len(pending), "units": len(discovered)}
+
+    def _merged_entries(self) -> list:
+        # Urutan prioritas sumber bila nama bentrok: registry/desktop, bawaan, lalu $PATH.
+        priority = {"registry": 0, "desktop": 0, "builtin": 1, "path": 2}
+        entries = [entry for unit in self._units.values() for entry in unit["entries"]]
+        return sorted(entries, key=lambda entry: priority.get(entry[3], 3))
+
+    def _build_lookup(self, entries: list):
+        self._entries = {}
+        self._sources = {}
+        self._keys = {}
+        token_index = defaultdict(set)
+        trigram_index = defaultdict(set)
+        for name, command, aliases, source in entries:
+            if name in self._entries:
+                continue
+            self._entries[name] = command
+            self._sources[name] = source
+            for key in [name] + aliases:
+                if key in self._keys:
+                    continue
+                self._keys[key] = name
+                for token in _tokens(key):
+                    token_index[token].add(key)
+                for trigram in _trigrams(key):
+                    trigram_index[trigram].add(key)
+        self._token_index = token_index
+        self._trigram_index = trigram_index
+
+    def _candidates(self, query: str, limit: int) -> list:
+        candidates = set()
+        for token in _tokens(query):
+            candidates.update(self._token_index.get(token, ()))
+        overlap = Counter()
+        for trigram in _trigrams(query):
+            for key in self._trigram_index.get(trigram, ()):
+                overlap[key] += 1
+        candidates.update(key for key, _ in overlap.most_common(limit))
+        return list(candidates)
+
+    def lookup(self, app_name: str, score_cutoff: int = 75, candidate_limit: int = 64):
+        """Mengembalikan (nama, perintah, skor) atau None."""
+        query = app_name.strip().lower()
+        if not query:
+            return None
+        with self._lock:
+            name = self._keys.get(query)
+            if name is not None:
+                return name, self._entries[name], 100
+            best = None
+            query_tokens = set(_tokens(query))
+            for key in self._candidates(query, candidate_limit):
+                # WRatio memberi skor tinggi untuk kecocokan parsial; kunci yang jauh lebih pendek
+                # (mis. "sh" untuk "shutdown") hanya diterima bila berbagi kata utuh dengan query.
+                shorter, longer = sorted((len(key), len(query)))
+                if shorter < 0.5 * longer:
+                    key_tokens = set(_tokens(key))
+                    if not (key_tokens <= query_tokens or query_tokens <= key_tokens):
+                        continue
+                # Ribuan perintah CLI di $PATH mudah cocok secara kebetulan ("log" -> "logoff"); hanya nama persis.
+                if self._sources[self._keys[key]] == "path":
+                    continue
+                score = fuzz.WRatio(query, key)
+                if score >= score_cutoff and (best is None or score > best[1]):
+                    best = (key, score)
+            if best is None:
+                return None
+            name = self._keys[best[0]]
+            return name, self._entries[name], best[1]
@@ -0,0 +1,78 @@
+# backend/ai_core/audio_ingest.py
+
+import io
+import numpy as np
+import soundfile as sf
+
+TARGET_SAMPLE_RATE = 16000
+# Content-type untuk PCM int16 little-endian mentah; rate/kanal dibaca dari header.
+RAW_PCM_TYPES = {"application/octet-stream", "audio/l16", "audio/pcm", "audio/x-raw"}
+# Panjang filter low-pass (ganjil) untuk resampling turun; cukup untuk ucapan tanpa biaya berarti.
+LOWPASS_TAPS = 63
+
+
+class AudioDecodeError(ValueError):
+    pass
+
+
+def is_raw_pcm(content_type: str) -> bool:
+    return (content_type or "").split(";")[0].strip().lower() in RAW_PCM_TYPES
+
+
+def pcm16_to_float32(data: bytes, channels: int = 1) -> np.ndarray:
+    """PCM int16 mentah -> float32 mono; downmix dan normalisasi dalam satu operasi vektor."""
+    if channels < 1:
+        raise AudioDecodeError(f"Jumlah kanal tidak valid: {channels}")
+    usable = len(data) - len(data) % (2 * channels)
+    pcm = np.frombuffer(data, dtype="<i2", count=usable // 2)
+    if channels == 1:
+        return np.multiply(pcm, np.float32(1.0 / 32768.0), dtype=np.float32)
+    # mean dengan akumulator float32 langsung menghasilkan mono tanpa salinan float64 antara.
+    mono = pcm.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+    mono *= np.float32(1.0 / 32768.0)
+    return mono
+
+
+def _lowpass_kernel(cutoff: float, taps: int = LOWPASS_TAPS) -> np.ndarray:
+    """Windowed-sinc; cutoff dalam pecahan laju sampel masukan (0..0.5)."""
+    n = np.arange(taps, dtype=np.float32) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hanning(taps).astype(np.float32)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(audio: np.ndarray, source_rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Resampling vektor NumPy: low-pass anti-aliasing saat turun, lalu interpolasi linear."""
+    if source_rate == target_rate or audio.size == 0:
+        return audio
+    if source_rate > target_rate:
+        # Batas sedikit di bawah Nyquist target supaya frekuensi tinggi tidak terlipat ke pita ucapan.
+        audio = np.convolve(audio, _lowpass_kernel(0.45 * target_rate / source_rate), mode="same")
+        if source_rate % target_rate == 0:
+            return np.ascontiguousarray(audio[::source_rate // target_rate], dtype=np.float32)
+    duration = audio.size / source_rate
+    target_length = int(round(duration * target_rate))
+    positions = np.arange(target_length, dtype=np.float64) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(audio.size), audio).astype(np.float32)
+
+
+def decode_audio(data: bytes, content_type: str = None, sample_rate: int = None, channels: int = None):
+    """Mendekode unggahan ke float32 mono 16 kHz.
+
+    Mendukung PCM int16 mentah (content-type RAW_PCM_TYPES, rate/kanal dari argumen) serta
+    semua format libsndfile: WAV, FLAC, dan Ogg Opus/Vorbis. Mengembalikan (audio, laju sampel asal).
+    """
+    if not data:
+        raise AudioDecodeError("Audio kosong.")
+    if is_raw_pcm(content_type):
+        source_rate = int(sample_rate or TARGET_SAMPLE_RATE)
+        if source_rate <= 0:
+            raise AudioDecodeError(f"Laju sampel tidak valid: {source_rate}")
+        audio = pcm16_to_float32(data, int(channels or 1))
+    else:
+        try:
+            audio, source_rate = sf.read(io.BytesIO(data), dtype="float32", always_2d=False)
+        except Exception as e:
+            raise AudioDecodeError(f"Format audio tidak dikenali: {e}") from e
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1, dtype=np.float32)
+    return resample(audio, source_rate), source_rate
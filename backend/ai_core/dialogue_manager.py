@@ -1,13 +1,30 @@
 # backend/ai_core/dialogue_manager.py
 
-import google.generativeai as genai
 import json
+import os
+import time
+
+from ai_core import telemetry
+from ai_core.memory import SessionStore
+from ai_core.llm_client import LLMClient, GeminiClient
+from ai_core.llm_stream import DecisionStreamParser, SentenceStream
+from ai_core.response_cache import ResponseCache, cache_from_env, history_fingerprint, is_cacheable
+
+# Anggaran token riwayat per sesi (di luar system prompt).
+HISTORY_TOKEN_BUDGET = int(os.getenv("DM_HISTORY_TOKEN_BUDGET", "1500"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("DM_SUMMARY_TOKEN_BUDGET", "300"))
+SUMMARIZE_WITH_LLM = os.getenv("DM_SUMMARIZE_WITH_LLM", "0") == "1"
 
 class DialogueManager:
-    def __init__(self):
-        self.history = []
-        
-        self.model = genai.GenerativeModel('models/gemini-2.5-pro')
+    def __init__(self, llm_client: LLMClient = None, decision_cache: ResponseCache = None):
+        self.llm = llm_client or GeminiClient('models/gemini-2.5-pro')
+        self.decision_cache = decision_cache if decision_cache is not None else cache_from_env("llm_decisions.json")
+
+        self.sessions = SessionStore(
+            token_budget=HISTORY_TOKEN_BUDGET,
+            summary_budget=SUMMARY_TOKEN_BUDGET,
+            summarizer=self._summarize_with_llm if SUMMARIZE_WITH_LLM else None
+        )
 
         self.system_prompt = self._build_system_prompt()
         print("Dialogue Manager berbasis LLM siap.")
@@ -27,48 +44,177 @@ class DialogueManager:
         6. `set_volume(level: int)`: Mengatur volume sistem ke persentase tertentu (0-100).
         7. `mute_volume(mute: bool)`: Mematikan (true) atau menyalakan (false) suara sistem.
         8. `take_screenshot(path: str)`: Mengambil tangkapan layar dan menyimpannya ke path yang diberikan.
-        9. `Maps_browser(browser: str, url: str)`: Membuka browser spesifik (seperti 'chrome' atau 'firefox') dan menavigasi ke URL yang diberikan.
+        9. `navigate_browser(browser: str, url: str)`: Membuka browser spesifik (seperti 'chrome' atau 'firefox') dan menavigasi ke URL yang diberikan.
         10. `new_tab_and_navigate(url: str)`: Di browser yang sedang aktif, membuka tab baru dan menavigasi ke URL yang diberikan.
 
         Aturan:
         - Jika perintah pengguna dapat dipenuhi oleh salah satu alat, respons Anda HARUS HANYA berupa objek JSON tunggal dengan format: `{"tool_call": {"name": "nama_alat", "parameters": {"nama_parameter": "nilai"}}}`.
+        - Jika perintah pengguna membutuhkan beberapa alat sekaligus, respons Anda HARUS HANYA berupa objek JSON tunggal dengan format: `{"plan": [{"id": "1", "name": "nama_alat", "parameters": {...}}, {"id": "2", "name": "nama_alat", "parameters": {...}, "depends_on": ["1"]}]}`. Isi `depends_on` hanya jika langkah itu harus menunggu langkah lain selesai (mis. membuka tab baru setelah browser terbuka); langkah tanpa `depends_on` dijalankan bersamaan.
         - Jika perintah pengguna adalah pertanyaan umum, salam, atau percakapan yang tidak memerlukan alat, respons Anda HARUS HANYA berupa objek JSON tunggal dengan format: `{"final_answer": "jawaban Anda dalam bentuk teks"}`.
         - Jangan menambahkan penjelasan apa pun di luar format JSON.
         """
 
-    def process(self, user_text: str) -> dict:
-        self.history.append({"role": "user", "text": user_text})
+    def _summarize_with_llm(self, summary: str, evicted: list) -> str:
+        turns = "\n".join(f"- {role}: {text}" for role, text in evicted)
+        prompt = (
+            "Perbarui ringkasan percakapan berikut dengan giliran baru. "
+            "Tulis maksimal tiga kalimat, pertahankan fakta penting dan preferensi pengguna.\n\n"
+            f"Ringkasan lama: {summary or '(kosong)'}\n\nGiliran baru:\n{turns}"
+        )
+        return self.llm.generate(prompt)
 
-        full_prompt = self.system_prompt + "\n\nRiwayat Percakapan:\n"
-        for turn in self.history:
-            full_prompt += f"- {turn['role']}: {turn['text']}\n"
-        
-        try:
-            response_text = self.model.generate_content(full_prompt).text
-            response_text = response_text.strip().replace("```json", "").replace("```", "").strip()
-            decision = json.loads(response_text)
-        except (json.JSONDecodeError, Exception) as e:
-            print(f"Error memproses respons LLM: {e}\nMencoba menjawab langsung...")
-            return {"type": "response", "message": "Maaf, terjadi sedikit gangguan di otak saya. Bisa ulangi lagi?"}
+    def process(self, user_text: str, session_id: str = "default") -> dict:
+        with telemetry.stage("dialogue") as span:
+            result = self._process(user_text, session_id)
+            span["cached"] = bool(result.get("cached"))
+            span["type"] = result["type"]
+        return result
+
+    def _process(self, user_text: str, session_id: str) -> dict:
+        history, cache_key, use_cache, decision = self._lookup(user_text, session_id)
+        cached = decision is not None
+
+        if decision is None:
+            try:
+                with telemetry.stage("llm", purpose="decision"):
+                    response_text = self.llm.generate(self._prompt(history))
+                response_text = response_text.strip().replace("```json", "").replace("```", "").strip()
+                decision = json.loads(response_text)
+            except (json.JSONDecodeError, Exception) as e:
+                print(f"Error memproses respons LLM: {e}\nMencoba menjawab langsung...")
+                return {"type": "response", "message": "Maaf, terjadi sedikit gangguan di otak saya. Bisa ulangi lagi?"}
+
+            self._store(cache_key, use_cache, decision)
+
+        return self._conclude(history, decision, cached)
+
+    def process_stream(self, user_text: str, session_id: str = "default"):
+        """Seperti process(), tetapi respons LLM dibaca sebagai stream token.
+
+        Menghasilkan ("sentence", teks) untuk tiap kalimat final_answer yang sudah lengkap selagi
+        sisanya masih ditulis, lalu ("result", hasil) dengan bentuk yang sama seperti process().
+        tool_call dikembalikan begitu objek JSON-nya tertutup. Keputusan dari cache hanya
+        menghasilkan event "result".
+        """
+        with telemetry.stage("dialogue", streamed=True) as span:
+            for event in self._process_stream(user_text, session_id):
+                if event[0] == "result":
+                    span["cached"] = bool(event[1].get("cached"))
+                    span["type"] = event[1]["type"]
+                yield event
+
+    def _process_stream(self, user_text: str, session_id: str):
+        history, cache_key, use_cache, decision = self._lookup(user_text, session_id)
+        cached = decision is not None
 
+        if decision is None:
+            parser = DecisionStreamParser()
+            sentences = SentenceStream()
+            started = time.perf_counter()
+            spoken = False
+            try:
+                for chunk in self.llm.generate_stream(self._prompt(history)):
+                    for sentence in sentences.feed(parser.feed(chunk)):
+                        if not spoken:
+                            telemetry.record_stage("llm_first_sentence", time.perf_counter() - started, start=started)
+                            spoken = True
+                        yield ("sentence", sentence)
+                    if parser.complete:
+                        break
+                telemetry.record_stage("llm", time.perf_counter() - started, start=started, purpose="decision", streamed=True)
+                decision = parser.result()
+            except (json.JSONDecodeError, Exception) as e:
+                print(f"Error memproses respons LLM: {e}\nMencoba menjawab langsung...")
+                if spoken:
+                    # Sebagian jawaban sudah diucapkan; catat apa adanya alih-alih pesan gangguan.
+                    decision = {"final_answer": parser.answer_text}
+                else:
+                    yield ("result", {"type": "response", "message": "Maaf, terjadi sedikit gangguan di otak saya. Bisa ulangi lagi?"})
+                    return
+            else:
+                self._store(cache_key, use_cache, decision)
+
+            for sentence in sentences.flush():
+                yield ("sentence", sentence)
+
+        yield ("result", self._conclude(history, decision, cached))
+
+    def _lookup(self, user_text: str, session_id: str):
+        history = self.sessions.get(session_id)
+        # Sidik jari dihitung sebelum giliran baru ditambahkan: hanya konteks sebelumnya yang relevan.
+        fingerprint = history_fingerprint(user_text, history.recent(2))
+        history.add("user", user_text)
+
+        use_cache = is_cacheable(user_text)
+        cache_key = ResponseCache.make_key(user_text, fingerprint, namespace="decision")
+        if use_cache:
+            decision = self.decision_cache.get(cache_key)
+        else:
+            self.decision_cache.note_bypass()
+            decision = None
+        telemetry.count_event("llm_decision_cache", "bypass" if not use_cache else "hit" if decision is not None else "miss")
+        return history, cache_key, use_cache, decision
+
+    def _prompt(self, history) -> str:
+        return "".join([self.system_prompt, "\n\nRiwayat Percakapan:\n", history.render()])
+
+    def _store(self, cache_key: str, use_cache: bool, decision):
+        if use_cache and isinstance(decision, dict) and ("tool_call" in decision or "plan" in decision or "final_answer" in decision):
+            self.decision_cache.put(cache_key, decision)
+
+    def _conclude(self, history, decision: dict, cached: bool) -> dict:
+        steps = self._plan_steps(decision["plan"]) if "plan" in decision else []
         if "tool_call" in decision:
             tool_name = decision["tool_call"]["name"]
             parameters = decision["tool_call"]["parameters"]
             
             action_intent = tool_name 
             
-            self.history.append({"role": "assistant", "text": f"Menggunakan alat: {tool_name} dengan parameter {parameters}"})
+            history.add("assistant", f"Menggunakan alat: {tool_name} dengan parameter {parameters}")
             
-            return {"type": "action", "data": {"action": action_intent, "parameters": parameters}}
+            return {"type": "action", "data": {"action": action_intent, "parameters": parameters}, "cached": cached}
         
+        elif steps:
+            history.add("assistant", "Menjalankan rencana: " + ", ".join(
+                f"{step['action']} {step['parameters']}" for step in steps))
+            return {"type": "action", "data": {"action": "plan", "parameters": {"steps": steps}}, "cached": cached}
+
         elif "final_answer" in decision:
             response_message = decision["final_answer"]
-            self.history.append({"role": "assistant", "text": response_message})
-            return {"type": "response", "message": response_message}
+            history.add("assistant", response_message)
+            return {"type": "response", "message": response_message, "cached": cached}
             
         else:
-            self.history.append({"role": "assistant", "text": "Format keputusan tidak dikenali."})
+            history.add("assistant", "Format keputusan tidak dikenali.")
             return {"type": "response", "message": "Saya tidak yakin apa yang harus dilakukan."}
 
-    def reset(self):
-        self.history = []
\ No newline at end of file
+    @staticmethod
+    def _plan_steps(plan) -> list:
+        """Langkah rencana LLM dalam format ActionExecutor; kosong bila formatnya tidak dikenali."""
+        if not isinstance(plan, list) or not all(isinstance(step, dict) and step.get("name") for step in plan):
+            return []
+        return [
+            {
+                "id": str(step.get("id", index + 1)),
+                "action": step["name"],
+                "parameters": step.get("parameters") or {},
+                "depends_on": [str(dep) for dep in DialogueManager._as_list(step.get("depends_on"))],
+            }
+            for index, step in enumerate(plan)
+        ]
+
+    @staticmethod
+    def _as_list(value) -> list:
+        # LLM kadang menulis "depends_on": "12" atau 1; skalar berarti satu id, bukan deretan karakter.
+        if value is None or value == "":
+            return []
+        return list(value) if isinstance(value, (list, tuple)) else [value]
+
+    def remember(self, user_text: str, assistant_text: str, session_id: str = "default"):
+        """Mencatat giliran yang dilayani tanpa LLM agar konteks sesi tetap utuh."""
+        history = self.sessions.get(session_id)
+        history.add("user", user_text)
+        history.add("assistant", assistant_text)
+
+    def reset(self, session_id: str = None):
+        self.sessions.reset(session_id)
\ No newline at end of file
@@ -0,0 +1,88 @@
+# backend/ai_core/intent_router.py
+
+import re
+
+# Kata sapaan/sopan di awal atau akhir ucapan yang tidak mengubah maksud perintah.
+_PREFIX = re.compile(r"^(?:(?:halo|hai|hei|hey|oke|ok)\s+)?(?:kina\s+)?(?:(?:tolong|coba|please|bisa)\s+)*")
+_SUFFIX = re.compile(r"\s+(?:dong|ya|yah|deh|sekarang|please|sih)$")
+_PUNCTUATION = re.compile(r"[^\w\s%.:/-]")
+# Ucapan majemuk atau pertanyaan diserahkan ke LLM agar tidak salah dipotong.
+_COMPOUND = re.compile(r"\b(?:dan|lalu|kemudian|terus|setelah|and|then|apa|kenapa|bagaimana|gimana|siapa|kapan|why|how|what)\b")
+
+MAX_PAYLOAD_WORDS = 5
+# "buka tab baru ..." atau "buka youtube.com" adalah navigasi browser, bukan membuka aplikasi.
+_NAVIGATION_PAYLOAD = re.compile(r"^(?:tab|situs|website|web|halaman|link)\b|https?:|www\.|\.\w{2,}(?:/|$)")
+
+
+def normalize_command(text: str) -> str:
+    text = _PUNCTUATION.sub(" ", text.lower())
+    text = " ".join(text.split()).rstrip(".")
+    text = _PREFIX.sub("", text)
+    return _SUFFIX.sub("", text).strip()
+
+
+class IntentRouter:
+    """Mencocokkan perintah sederhana dengan pola terkompilasi sehingga tidak perlu memanggil LLM.
+
+    `app_lookup` (mis. AppIndex.lookup) dipakai untuk memastikan "buka X" memang menyebut aplikasi
+    terpasang; "buka pintu" dan sejenisnya diteruskan ke LLM.
+    """
+
+    def __init__(self, min_confidence: float = 0.9, app_lookup=None):
+        self.min_confidence = min_confidence
+        self.app_lookup = app_lookup
+        # (pola, pembuat aksi, keyakinan). Pola selalu berjangkar agar seluruh ucapan harus cocok.
+        self.rules = [
+            (re.compile(r"^(?:(?:atur|set|ubah|setel|jadikan)\s+)?(?:volume|suara)(?:\s+(?:sistem|komputer))?\s+(?:ke\s+|jadi\s+|menjadi\s+|to\s+)?(\d{1,3})(?:\s*(?:%|persen|percent))?$"),
+             lambda m: ("set_volume", {"level": int(m.group(1))}), 0.97),
+            (re.compile(r"^(?:volume|suara)\s+(\d{1,3})\s*(?:%|persen|percent)?$"),
+             lambda m: ("set_volume", {"level": int(m.group(1))}), 0.95),
+            (re.compile(r"^(?:unmute|nyalakan(?:\s+kembali)?\s+suara|hidupkan\s+suara|bunyikan\s+suara)$"),
+             lambda m: ("mute_volume", {"mute": False}), 0.97),
+            (re.compile(r"^(?:mute|bisukan(?:\s+suara)?|matikan\s+suara|senyapkan(?:\s+suara)?)$"),
+             lambda m: ("mute_volume", {"mute": True}), 0.97),
+            (re.compile(r"^(?:ambil\s+|buat\s+|take\s+(?:a\s+)?)?(?:screenshot|tangkapan\s+layar|tangkap\s+layar|screen\s+shot)$"),
+             lambda m: ("take_screenshot", {}), 0.97),
+            (re.compile(r"^(?:cari|carikan|search|search\s+for|googling)\s+(?:tentang\s+|di\s+google\s+)?(.+)$"),
+             lambda m: ("search_web", {"query": m.group(1)}), 0.92),
+            (re.compile(r"^(?:buka|bukakan|jalankan|open|launch|start)\s+(?:aplikasi\s+|app\s+)?(.+)$"),
+             lambda m: ("open_app", {"app_name": m.group(1)}), 0.92),
+        ]
+        self.local_hits = 0
+        self.llm_fallbacks = 0
+
+    def match(self, text: str):
+        command = normalize_command(text)
+        if not command:
+            return None
+        for pattern, build, confidence in self.rules:
+            m = pattern.match(command)
+            if not m:
+                continue
+            action, parameters = build(m)
+            payload = next((v for v in parameters.values() if isinstance(v, str)), None)
+            if payload is not None:
+                payload_words = payload.split()
+                if len(payload_words) > MAX_PAYLOAD_WORDS or _COMPOUND.search(payload):
+                    return None
+            if action == "open_app":
+                if _NAVIGATION_PAYLOAD.search(parameters["app_name"]):
+                    return None
+                if self.app_lookup is not None and self.app_lookup(parameters["app_name"]) is None:
+                    return None
+            if action == "set_volume" and not 0 <= parameters["level"] <= 100:
+                return None
+            return {"action": action, "parameters": parameters, "confidence": confidence}
+        return None
+
+    def route(self, text: str):
+        """Mengembalikan objek aksi untuk ActionExecutor, atau None bila harus diteruskan ke LLM."""
+        result = self.match(text)
+        if result is None or result["confidence"] < self.min_confidence:
+            self.llm_fallbacks += 1
+            return None
+        self.local_hits += 1
+        return {"action": result["action"], "parameters": result["parameters"]}
+
+    def stats(self) -> dict:
+        return {"local_hits": self.local_hits, "llm_fallbacks": self.llm_fallbacks}
@@ -0,0 +1,74 @@
+# backend/ai_core/llm_client.py
+
+import time
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+
+class LLMClient:
+    """Antarmuka minimal untuk model bahasa: satu prompt masuk, satu teks keluar."""
+
+    name = "base"
+
+    def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    def generate_stream(self, prompt: str):
+        """Potongan teks selagi model menulis; bawaan: seluruh jawaban sebagai satu potongan."""
+        yield self.generate(prompt)
+
+
+class GeminiClient(LLMClient):
+    name = "gemini"
+
+    def __init__(self, model_name: str = 'models/gemini-2.5-pro'):
+        if genai is None:
+            raise ImportError("Paket 'google-generativeai' tidak terpasang.")
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    def generate_stream(self, prompt: str):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class StubLLMClient(LLMClient):
+    """Klien lokal deterministik untuk pengujian dan mode offline.
+
+    `responses` dapat berupa dict (substring prompt -> jawaban) atau callable(prompt) -> jawaban.
+    generate_stream() memecah jawaban menjadi potongan `chunk_chars` karakter dengan jeda
+    `chunk_delay` detik untuk meniru stream token.
+    """
+
+    name = "stub"
+
+    def __init__(self, responses=None, default: str = '{"final_answer": "Ini jawaban dari model lokal."}',
+                 chunk_chars: int = 8, chunk_delay: float = 0.0):
+        self.responses = responses or {}
+        self.default = default
+        self.chunk_chars = chunk_chars
+        self.chunk_delay = chunk_delay
+        self.calls = []
+
+    def generate(self, prompt: str) -> str:
+        self.calls.append(prompt)
+        if callable(self.responses):
+            return self.responses(prompt)
+        # Kunci terpanjang dicocokkan lebih dulu supaya aturan yang lebih spesifik menang.
+        for needle in sorted(self.responses, key=len, reverse=True):
+            if needle in prompt:
+                return self.responses[needle]
+        return self.default
+
+    def generate_stream(self, prompt: str):
+        text = self.generate(prompt)
+        for start in range(0, len(text), self.chunk_chars):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_chars]
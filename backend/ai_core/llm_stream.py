@@ -0,0 +1,158 @@
+# backend/ai_core/llm_stream.py
+
+import re
+import json
+
+# Sama dengan pemecah kalimat TTS; didefinisikan ulang agar modul dialog tidak perlu mengimpor torch.
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+_WORD_BREAK = re.compile(r"\s+")
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def _last_match(pattern, text: str, end: int):
+    match = None
+    for match in pattern.finditer(text, 0, end):
+        pass
+    return match
+
+
+class DecisionStreamParser:
+    """Membaca amplop keputusan LLM ({"tool_call": ...} / {"final_answer": "..."}) secara bertahap.
+
+    feed() menerima potongan teks mentah (boleh diawali pagar kode ```json) dan mengembalikan
+    teks final_answer yang baru terdekode. `complete` menjadi True begitu objek JSON tingkat atas
+    tertutup, sehingga tool_call dapat dijalankan tanpa menunggu sisa stream.
+    """
+
+    def __init__(self):
+        self._raw = []
+        self._object = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = None
+        self._string = None
+        self._expect = None
+        self._key = None
+        self._answer = False
+        self._high_surrogate = None
+        self.answer_text = ""
+        self.complete = False
+
+    def feed(self, chunk: str) -> str:
+        self._raw.append(chunk)
+        decoded = []
+        for char in chunk:
+            if self.complete:
+                break
+            if self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._expect = "key"
+                    self._object.append(char)
+                continue
+            self._object.append(char)
+            if self._in_string:
+                self._string_char(char, decoded)
+            else:
+                self._structural_char(char)
+        delta = "".join(decoded)
+        self.answer_text += delta
+        return delta
+
+    def _structural_char(self, char: str):
+        if char == '"':
+            self._in_string = True
+            if self._depth == 1 and self._expect == "key":
+                self._string = []
+            elif self._depth == 1 and self._expect == "value" and self._key == "final_answer":
+                self._answer = True
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+            self.complete = self._depth == 0
+        elif self._depth == 1 and char == ":":
+            self._expect = "value"
+        elif self._depth == 1 and char == ",":
+            self._expect = "key"
+
+    def _string_char(self, char: str, decoded: list):
+        if self._escape is not None:
+            if self._escape.startswith("u"):
+                self._escape += char
+                if len(self._escape) == 5:
+                    self._emit(self._unicode(int(self._escape[1:], 16)), decoded)
+                    self._escape = None
+                return
+            self._escape = None
+            if char == "u":
+                self._escape = "u"
+                return
+            self._emit(_ESCAPES.get(char, char), decoded)
+        elif char == "\\":
+            self._escape = ""
+        elif char == '"':
+            self._in_string = False
+            if self._string is not None:
+                self._key = "".join(self._string)
+                self._string = None
+                self._expect = None
+            self._answer = False
+        else:
+            self._emit(char, decoded)
+
+    def _unicode(self, code: int) -> str:
+        # Pasangan surrogate (mis. emoji) baru digabung setelah separuh keduanya tiba.
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+            return ""
+        if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        return chr(code)
+
+    def _emit(self, text: str, decoded: list):
+        if self._string is not None:
+            self._string.append(text)
+        elif self._answer:
+            decoded.append(text)
+
+    def result(self) -> dict:
+        """Objek keputusan lengkap; bila stream terputus, dicoba seperti parser lama (buang pagar kode)."""
+        if self.complete:
+            return json.loads("".join(self._object))
+        text = "".join(self._raw).strip().replace("```json", "").replace("```", "").strip()
+        return json.loads(text)
+
+
+class SentenceStream:
+    """Mengumpulkan teks yang mengalir dan melepaskan kalimat yang sudah lengkap untuk TTS."""
+
+    def __init__(self, max_chars: int = 200):
+        self.max_chars = max_chars
+        self._pending = ""
+
+    def feed(self, text: str) -> list:
+        if not text:
+            return []
+        self._pending += text
+        boundary = _last_match(_SENTENCE_END, self._pending, len(self._pending))
+        sentences = []
+        if boundary is not None:
+            ready, self._pending = self._pending[:boundary.start()], self._pending[boundary.end():]
+            sentences = [s.strip() for s in _SENTENCE_END.split(ready) if s.strip()]
+        # Kalimat sangat panjang dipotong di jeda klausa (atau kata) agar TTS tidak menunggu terlalu lama.
+        while len(self._pending) > self.max_chars:
+            cut = _last_match(_CLAUSE_END, self._pending, self.max_chars)
+            if cut is None or cut.start() < self.max_chars // 2:
+                cut = _last_match(_WORD_BREAK, self._pending, self.max_chars)
+            if cut is None or cut.start() == 0:
+                break
+            sentences.append(self._pending[:cut.start()].strip())
+            self._pending = self._pending[cut.end():]
+        return sentences
+
+    def flush(self) -> list:
+        rest, self._pending = self._pending.strip(), ""
+        return [rest] if rest else []
@@ -0,0 +1,115 @@
+# backend/ai_core/memory.py
+
+import threading
+from collections import deque
+
+
+def estimate_tokens(text: str) -> int:
+    # Perkiraan kasar ~4 karakter per token; cukup untuk menjaga anggaran tanpa tokenizer.
+    return max(1, (len(text) + 3) // 4)
+
+
+class ConversationMemory:
+    """Riwayat satu sesi: jendela giliran terbaru plus ringkasan bergulir dalam anggaran token."""
+
+    def __init__(self, token_budget: int = 1500, summary_budget: int = 300, summarizer=None,
+                 token_counter=estimate_tokens):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        # summarizer(ringkasan_lama, giliran_yang_dikeluarkan) -> ringkasan_baru; opsional.
+        self.summarizer = summarizer
+        self.count_tokens = token_counter
+        self._turns = deque()
+        self._turn_tokens = 0
+        self._summary_lines = deque()
+        self._summary_tokens = 0
+        self.summary = ""
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    @property
+    def tokens(self) -> int:
+        return self._turn_tokens + self._summary_tokens
+
+    def add(self, role: str, text: str):
+        line = f"- {role}: {text}\n"
+        tokens = self.count_tokens(line)
+        self._turns.append((role, text, line, tokens))
+        self._turn_tokens += tokens
+        self._enforce_budget()
+
+    def _enforce_budget(self):
+        evicted = []
+        # Giliran terbaru selalu dipertahankan walaupun sendirian melebihi anggaran.
+        while len(self._turns) > 1 and self._turn_tokens > self.token_budget - self._summary_tokens:
+            role, text, line, tokens = self._turns.popleft()
+            self._turn_tokens -= tokens
+            evicted.append((role, text))
+        if evicted:
+            self._fold_into_summary(evicted)
+
+    def _fold_into_summary(self, evicted: list):
+        if self.summarizer is not None:
+            try:
+                self.summary = self.summarizer(self.summary, evicted).strip()
+                self._summary_tokens = self.count_tokens(self.summary) if self.summary else 0
+                return
+            except Exception as e:
+                print(f"Gagal meringkas riwayat, memakai ringkasan sederhana: {e}")
+
+        # Ringkasan ekstraktif: potongan pendek tiap giliran lama, yang tertua dibuang lebih dulu.
+        for role, text in evicted:
+            snippet = text if len(text) <= 120 else text[:117] + "..."
+            line = f"{role}: {snippet}"
+            self._summary_lines.append((line, self.count_tokens(line)))
+            self._summary_tokens += self._summary_lines[-1][1]
+        while self._summary_lines and self._summary_tokens > self.summary_budget:
+            _, tokens = self._summary_lines.popleft()
+            self._summary_tokens -= tokens
+        self.summary = "; ".join(line for line, _ in self._summary_lines)
+
+    def render(self) -> str:
+        parts = []
+        if self.summary:
+            parts.append(f"Ringkasan percakapan sebelumnya: {self.summary}\n")
+        parts.extend(line for _, _, line, _ in self._turns)
+        return "".join(parts)
+
+    def recent(self, n: int) -> list:
+        return [(role, text) for role, text, _, _ in list(self._turns)[-n:]]
+
+    def clear(self):
+        self._turns.clear()
+        self._turn_tokens = 0
+        self._summary_lines.clear()
+        self._summary_tokens = 0
+        self.summary = ""
+
+
+class SessionStore:
+    """Menyimpan ConversationMemory per session_id, dengan batas jumlah sesi aktif."""
+
+    def __init__(self, max_sessions: int = 64, **memory_kwargs):
+        self.max_sessions = max_sessions
+        self.memory_kwargs = memory_kwargs
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> ConversationMemory:
+        with self._lock:
+            memory = self._sessions.pop(session_id, None)
+            if memory is None:
+                memory = ConversationMemory(**self.memory_kwargs)
+            # Dict menjaga urutan sisip; sesi yang baru dipakai dipindah ke akhir.
+            self._sessions[session_id] = memory
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.pop(next(iter(self._sessions)))
+            return memory
+
+    def reset(self, session_id: str = None):
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
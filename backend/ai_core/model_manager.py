@@ -0,0 +1,147 @@
+# backend/ai_core/model_manager.py
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ModuleNotReady(Exception):
+    def __init__(self, name: str, state: str, error: str = None):
+        self.name = name
+        self.state = state
+        self.error = error
+        detail = f"Modul '{name}' belum siap (status: {state})."
+        if error:
+            detail += f" Error: {error}"
+        super().__init__(detail)
+
+
+class _ModuleSpec:
+    def __init__(self, name, factory, warmup, lazy, depends_on):
+        self.name = name
+        self.factory = factory
+        self.warmup = warmup
+        self.lazy = lazy
+        self.depends_on = tuple(depends_on)
+        self.state = "pending"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.ready_event = threading.Event()
+
+
+class ModelManager(dict):
+    """Registry modul AI yang memuat model secara paralel atau lazy, lengkap dengan warm-up.
+
+    Berperilaku seperti dict biasa: modul yang sudah siap (atau disuntikkan langsung, mis. untuk
+    benchmark) dibaca dengan `modules["stt"]`. Modul terdaftar yang belum siap memunculkan
+    ModuleNotReady alih-alih memblokir event loop; modul lazy mulai dimuat saat pertama diminta.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        super().__init__()
+        self._specs = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-loader")
+
+    def register(self, name: str, factory, warmup=None, lazy: bool = False, depends_on=()):
+        self._specs[name] = _ModuleSpec(name, factory, warmup, lazy, depends_on)
+
+    def start(self):
+        """Mulai memuat semua modul non-lazy secara bersamaan tanpa menunggu hasilnya."""
+        for name, spec in self._specs.items():
+            if not spec.lazy:
+                self._schedule(name)
+
+    def _schedule(self, name: str):
+        spec = self._specs[name]
+        with self._lock:
+            if spec.state != "pending":
+                return
+            spec.state = "queued"
+        for dependency in spec.depends_on:
+            self._schedule(dependency)
+        self._pool.submit(self._load, spec)
+
+    def _load(self, spec: _ModuleSpec):
+        try:
+            for dependency in spec.depends_on:
+                self.wait(dependency)
+            spec.state = "loading"
+            started = time.perf_counter()
+            instance = spec.factory()
+            spec.load_seconds = time.perf_counter() - started
+
+            if spec.warmup is not None:
+                spec.state = "warming"
+                started = time.perf_counter()
+                try:
+                    spec.warmup(instance)
+                except Exception as e:
+                    # Warm-up yang gagal tidak membuat modul tidak bisa dipakai.
+                    print(f"Warm-up modul '{spec.name}' gagal: {e}")
+                spec.warmup_seconds = time.perf_counter() - started
+
+            dict.__setitem__(self, spec.name, instance)
+            spec.state = "ready"
+            print(f"Modul '{spec.name}' siap ({spec.load_seconds:.1f} dtk muat"
+                  f"{f', {spec.warmup_seconds:.1f} dtk warm-up' if spec.warmup_seconds is not None else ''}).")
+        except Exception as e:
+            spec.state = "failed"
+            spec.error = str(e)
+            print(f"Gagal memuat modul '{spec.name}': {e}")
+        finally:
+            spec.ready_event.set()
+
+    def __getitem__(self, name: str):
+        try:
+            return dict.__getitem__(self, name)
+        except KeyError:
+            pass
+        self.ensure_ready(name)
+        return dict.__getitem__(self, name)
+
+    def ensure_ready(self, *names: str):
+        """Memunculkan ModuleNotReady bila salah satu modul belum siap; memicu muat untuk modul lazy."""
+        for name in names:
+            if dict.__contains__(self, name):
+                continue
+            spec = self._specs.get(name)
+            if spec is None:
+                raise ModuleNotReady(name, "unregistered")
+            if spec.state == "pending":
+                self._schedule(name)
+            raise ModuleNotReady(name, spec.state, spec.error)
+
+    def wait(self, name: str, timeout: float = None):
+        """Memblokir sampai modul siap. Hanya untuk thread latar belakang, bukan event loop."""
+        if dict.__contains__(self, name):
+            return dict.__getitem__(self, name)
+        spec = self._specs.get(name)
+        if spec is None:
+            raise ModuleNotReady(name, "unregistered")
+        self._schedule(name)
+        if not spec.ready_event.wait(timeout):
+            raise ModuleNotReady(name, spec.state)
+        if spec.state != "ready":
+            raise ModuleNotReady(name, spec.state, spec.error)
+        return dict.__getitem__(self, name)
+
+    def is_ready(self, *names: str) -> bool:
+        return all(dict.__contains__(self, name) for name in names)
+
+    def status(self) -> dict:
+        report = {}
+        for name in set(self._specs) | set(self.keys()):
+            spec = self._specs.get(name)
+            if spec is None:
+                report[name] = {"state": "ready", "lazy": False}
+                continue
+            report[name] = {
+                "state": "ready" if dict.__contains__(self, name) else spec.state,
+                "lazy": spec.lazy,
+                "load_seconds": spec.load_seconds,
+                "warmup_seconds": spec.warmup_seconds,
+                "error": spec.error,
+            }
+        return report
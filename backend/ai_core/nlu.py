@@ -1,28 +1,164 @@
 # backend/ai_core/nlu.py
 
-from transformers import pipeline
+import os
+import platform
+import threading
+from collections import OrderedDict
+
+try:
+    from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
+except ImportError:
+    pipeline = None
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForTokenClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+except ImportError:
+    onnxruntime = None
+
+NER_MODEL_NAME = os.getenv("NLU_MODEL", "cahya/bert-base-indonesian-NER")
+# auto: ONNX int8 di CPU bila optimum[onnxruntime] terpasang, PyTorch di GPU; bisa dipaksa "onnx"/"torch".
+NLU_BACKEND = os.getenv("NLU_BACKEND", "auto")
+NLU_DEVICE = os.getenv("NLU_DEVICE", "auto")
+NLU_BATCH_SIZE = int(os.getenv("NLU_BATCH_SIZE", "16"))
+NLU_CACHE_SIZE = int(os.getenv("NLU_CACHE_SIZE", "1024"))
+# Thread ONNX Runtime per sesi; 0 = bawaan ORT (semua core fisik).
+NLU_THREADS = int(os.getenv("NLU_THREADS", "0"))
+ONNX_CACHE_DIR = os.path.join("cache", "nlu_onnx")
+
+
+def _select_device() -> str:
+    if NLU_DEVICE != "auto":
+        return NLU_DEVICE
+    return "cuda" if torch is not None and torch.cuda.is_available() else "cpu"
+
+
+def _quantization_config():
+    # Kuantisasi dinamis: bobot int8 disimpan, aktivasi dikuantisasi saat inferensi (tanpa kalibrasi).
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
 
 class NLU:
-    def __init__(self):
+    """Intent berbasis aturan plus ekstraksi entitas NER yang cukup ringan untuk setiap ucapan.
+
+    Model NER berjalan lewat ONNX Runtime int8 di CPU atau PyTorch di GPU. process_many()
+    mengelompokkan ucapan dengan panjang token serupa agar padding per batch minimal, dan
+    hasil per ucapan disimpan dalam cache LRU.
+    """
+
+    def __init__(self, model_name: str = NER_MODEL_NAME, backend: str = NLU_BACKEND, batch_size: int = NLU_BATCH_SIZE,
+                 cache_size: int = NLU_CACHE_SIZE):
+        if pipeline is None:
+            raise ImportError("Paket 'transformers' tidak terpasang.")
         print("Memuat model NLU untuk Bahasa Indonesia...")
-        model_name = "cahya/bert-base-indonesian-NER"
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = _select_device()
+        self.backend = backend
+        if backend == "auto":
+            self.backend = "onnx" if self.device == "cpu" and onnxruntime is not None else "torch"
+        # Satu tokenizer dipakai bersama untuk menghitung panjang batch dan oleh pipeline NER.
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = self._load_onnx() if self.backend == "onnx" else self._load_torch()
         self.ner_pipeline = pipeline(
-            "ner", 
-            model=model_name, 
-            tokenizer=model_name, 
-            grouped_entities=True,
-            device=0  
+            "ner",
+            model=model,
+            tokenizer=self.tokenizer,
+            aggregation_strategy="simple",
+            device=0 if self.backend == "torch" and self.device == "cuda" else -1
+        )
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        print(f"Model NLU berhasil dimuat ({self.backend}, {self.device}).")
+
+    def _load_torch(self):
+        return AutoModelForTokenClassification.from_pretrained(self.model_name)
+
+    def _load_onnx(self):
+        if onnxruntime is None:
+            raise ImportError("Backend ONNX membutuhkan paket 'optimum[onnxruntime]'.")
+        export_dir = os.path.join(ONNX_CACHE_DIR, self.model_name.replace("/", "--"))
+        quantized_path = os.path.join(export_dir, "model_quantized.onnx")
+        if not os.path.exists(quantized_path):
+            # Ekspor dan kuantisasi hanya sekali; hasilnya dipakai ulang pada start berikutnya.
+            print("Mengekspor model NER ke ONNX dan mengkuantisasi ke int8 (sekali saja)...")
+            exported = ORTModelForTokenClassification.from_pretrained(self.model_name, export=True)
+            exported.save_pretrained(export_dir)
+            quantizer = ORTQuantizer.from_pretrained(exported)
+            quantizer.quantize(save_dir=export_dir, quantization_config=_quantization_config())
+        session_options = onnxruntime.SessionOptions()
+        if NLU_THREADS > 0:
+            session_options.intra_op_num_threads = NLU_THREADS
+        return ORTModelForTokenClassification.from_pretrained(
+            export_dir, file_name="model_quantized.onnx", session_options=session_options
         )
-        print("Model NLU berhasil dimuat di GPU.")
 
     def process(self, text: str) -> dict:
-        text = text.lower()
-        
-        intent = self._recognize_intent(text)
-        
-        entities = self._extract_entities(text, intent)
+        return self.process_many([text])[0]
+
+    def process_many(self, texts: list) -> list:
+        """Intent dan entitas untuk banyak ucapan sekaligus; urutan hasil sama dengan masukan."""
+        # Kapitalisasi dipertahankan untuk NER (petunjuk penting nama diri); aturan intent memakai huruf kecil.
+        normalized = [text.strip() for text in texts]
+        results, missing = {}, []
+        with self._lock:
+            for text in dict.fromkeys(normalized):
+                if text in self._cache:
+                    self._cache.move_to_end(text)
+                    results[text] = self._cache[text]
+                    self.cache_hits += 1
+                else:
+                    missing.append(text)
+                    self.cache_misses += 1
 
-        return {"intent": intent, "entities": entities}
+        if missing:
+            for text, named_entities in zip(missing, self._recognize_named_entities(missing)):
+                lowered = text.lower()
+                intent = self._recognize_intent(lowered)
+                results[text] = {
+                    "intent": intent,
+                    "entities": self._extract_entities(lowered, intent),
+                    "named_entities": named_entities,
+                }
+            with self._lock:
+                for text in missing:
+                    self._cache[text] = results[text]
+                    self._cache.move_to_end(text)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [results[text] for text in normalized]
+
+    def _recognize_named_entities(self, texts: list) -> list:
+        # Diurutkan menurut jumlah token supaya tiap batch berisi ucapan sepanjang serupa (padding minimal).
+        lengths = [len(ids) for ids in self.tokenizer(texts, truncation=True)["input_ids"]]
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+        found = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            outputs = self.ner_pipeline([texts[i] for i in batch], batch_size=len(batch))
+            for index, entities in zip(batch, outputs):
+                found[index] = [
+                    {"type": entity["entity_group"], "text": entity["word"], "score": round(float(entity["score"]), 4),
+                     "start": int(entity["start"]), "end": int(entity["end"])}
+                    for entity in entities
+                ]
+        return found
+
+    def cache_stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self.cache_hits, "misses": self.cache_misses}
 
     def _recognize_intent(self, text: str) -> str:
         if "mainkan" in text and ("spotify" in text or "lagu" in text):
@@ -34,7 +170,7 @@ class NLU:
         if "cari" in text or "carikan" in text:
             return "search_web"
         return "information_retrieval"
-        
+
     def _extract_entities(self, text: str, intent: str) -> dict:
         entities = {}
         if intent == "play_spotify":
@@ -51,5 +187,5 @@ class NLU:
             entities['query'] = payload
         elif intent == "information_retrieval":
             entities['question'] = text
-            
-        return entities
\ No newline at end of file
+
+        return entities
@@ -0,0 +1,141 @@
+# backend/ai_core/pipeline.py
+
+import os
+
+from ai_core import telemetry
+from ai_core.stt import SpeechToText
+from ai_core.stt_batcher import BatchingTranscriber, build_transcriber
+from ai_core.dialogue_manager import DialogueManager
+from ai_core.intent_router import IntentRouter
+from ai_core.action_executor import ActionExecutor
+from ai_core.action_jobs import ActionJobQueue
+from ai_core.tts import TextToSpeech
+from ai_core.nlu import NLU
+from ai_core.model_manager import ModelManager
+from ai_core.scheduler import InferenceScheduler
+
+STT_MODEL_SIZE = os.getenv("STT_MODEL_SIZE", "base")
+TEXT_MODULES = ("intent_router", "dialogue_manager", "action_executor", "action_jobs")
+
+
+def build_modules(lazy=()) -> ModelManager:
+    """Registry modul AI yang dipakai bersama oleh server FastAPI dan mode embedded run_assistant.py."""
+    lazy = set(lazy)
+    modules = ModelManager()
+    modules.register("stt", lambda: build_transcriber(SpeechToText(model_size=STT_MODEL_SIZE)),
+                     warmup=lambda stt: stt.warmup(), lazy="stt" in lazy)
+    # Indeks aplikasi milik ActionExecutor dipakai router untuk menolak "buka X" yang bukan aplikasi.
+    modules.register("intent_router",
+                     lambda: IntentRouter(app_lookup=lambda name: modules["action_executor"].app_index.lookup(name)))
+    modules.register("dialogue_manager", DialogueManager, lazy="dialogue_manager" in lazy)
+    modules.register("action_executor", ActionExecutor, lazy="action_executor" in lazy)
+    modules.register("action_jobs", lambda: ActionJobQueue(modules.wait("action_executor")),
+                     depends_on=("action_executor",), lazy="action_jobs" in lazy)
+    modules.register("tts", TextToSpeech, warmup=lambda tts: tts.warmup(), lazy="tts" in lazy)
+    # NER belum dipakai alur utama, jadi baru dimuat saat /api/nlu pertama kali dipanggil.
+    modules.register("nlu", NLU, lazy=True)
+    return modules
+
+
+def build_scheduler(modules) -> InferenceScheduler:
+    """Lane inferensi per model; konkurensi STT mengikuti ukuran batch agar batcher tetap terisi."""
+    scheduler = InferenceScheduler()
+
+    def stt_device():
+        stt = modules["stt"]
+        if isinstance(stt, BatchingTranscriber):
+            # Slot perangkat dipegang worker batcher hanya di sekitar panggilan model. Bila lane yang
+            # memegangnya selama transcribe() menunggu, hanya satu permintaan sampai ke batcher (batch 1).
+            stt.device_slot = scheduler.device_slot(stt.device)
+            return None
+        return getattr(stt, "device", "cpu")
+
+    scheduler.add_lane("stt", concurrency=lambda: getattr(modules["stt"], "max_batch_size", 1),
+                       max_queue=32, deadline=10.0, device=stt_device)
+    scheduler.add_lane("tts", concurrency=1, max_queue=16, deadline=15.0,
+                       device=lambda: getattr(modules["tts"], "device", "cpu"))
+    # Dialog sebagian besar menunggu API LLM, jadi boleh jauh lebih paralel daripada model lokal.
+    scheduler.add_lane("dialogue", concurrency=8, max_queue=64, deadline=30.0)
+    scheduler.add_lane("nlu", concurrency=1, max_queue=32, deadline=5.0, device=lambda: modules["nlu"].device)
+    return scheduler
+
+
+def execute_action(modules, action_object: dict) -> dict:
+    # Aksi UI/lama masuk antrean supaya jawaban bisa langsung diucapkan.
+    jobs = modules["action_jobs"]
+    if jobs.should_defer(action_object):
+        job = jobs.submit(action_object)
+        return {"message": modules["action_executor"].describe_pending(action_object), "job_id": job["id"]}
+    return {"message": modules["action_executor"].execute(action_object), "job_id": None}
+
+
+def run_dialogue_pipeline(modules, text: str, session_id: str = "default") -> dict:
+    result = _dialogue_pipeline(modules, text, session_id)
+    _note_route(result)
+    return result
+
+
+def run_dialogue_pipeline_stream(modules, text: str, session_id: str = "default"):
+    """Versi streaming run_dialogue_pipeline untuk jawaban yang langsung dibacakan.
+
+    Menghasilkan ("sentence", teks) selagi final_answer LLM masih ditulis, dan selalu diakhiri
+    ("result", hasil) dengan bentuk yang sama seperti run_dialogue_pipeline.
+    """
+    local_action = _route_locally(modules, text)
+    if local_action is not None:
+        result = _local_outcome(modules, text, local_action, session_id)
+    else:
+        for kind, payload in modules["dialogue_manager"].process_stream(text, session_id=session_id):
+            if kind == "sentence":
+                yield kind, payload
+            else:
+                result = _dialogue_outcome(modules, payload)
+    _note_route(result)
+    yield "result", result
+
+
+def _note_route(result: dict):
+    telemetry.count_event("route", result["route"])
+    trace = telemetry.current_trace()
+    if trace is not None:
+        trace.attributes["route"] = result["route"]
+
+
+def _route_locally(modules, text: str):
+    # Perintah sederhana dieksekusi langsung oleh router lokal; sisanya diteruskan ke LLM.
+    with telemetry.stage("intent_router"):
+        return modules["intent_router"].route(text)
+
+
+def _local_outcome(modules, text: str, local_action: dict, session_id: str) -> dict:
+    outcome = execute_action(modules, local_action)
+    modules["dialogue_manager"].remember(text, outcome["message"], session_id=session_id)
+    return {**outcome, "route": "local"}
+
+
+def _dialogue_pipeline(modules, text: str, session_id: str) -> dict:
+    local_action = _route_locally(modules, text)
+    if local_action is not None:
+        return _local_outcome(modules, text, local_action, session_id)
+    return _dialogue_outcome(modules, modules["dialogue_manager"].process(text, session_id=session_id))
+
+
+def _dialogue_outcome(modules, dm_result: dict) -> dict:
+    if dm_result['type'] == 'response':
+        outcome = {"message": dm_result['message'], "job_id": None}
+    elif dm_result['type'] == 'action':
+        outcome = execute_action(modules, dm_result['data'])
+    else:
+        outcome = {"message": "Terjadi kesalahan pada alur logika.", "job_id": None}
+    return {**outcome, "route": "cache" if dm_result.get("cached") else "llm"}
+
+
+def turn_result(transcribed_text: str, dialogue) -> dict:
+    if dialogue is None:
+        return {"text": transcribed_text, "response": None, "route": None, "job_id": None}
+    return {
+        "text": transcribed_text,
+        "response": dialogue["message"],
+        "route": dialogue["route"],
+        "job_id": dialogue["job_id"],
+    }
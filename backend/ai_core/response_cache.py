@@ -0,0 +1,188 @@
+# backend/ai_core/response_cache.py
+
+import os
+import re
+import json
+import atexit
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Pertanyaan yang jawabannya berubah seiring waktu tidak boleh dilayani dari cache.
+_TIME_SENSITIVE = re.compile(
+    r"\b(?:sekarang|saat ini|hari ini|besok|kemarin|minggu ini|bulan ini|tahun ini|jam berapa|pukul berapa|"
+    r"tanggal|cuaca|berita|terbaru|terkini|skor|harga|kurs|now|today|tomorrow|yesterday|latest|current|"
+    r"weather|news|score|price)\b"
+)
+# Rujukan ke giliran sebelumnya membuat keputusan bergantung pada konteks.
+_CONTEXT_DEPENDENT = re.compile(
+    r"\b(?:itu|ini|tadi|lagi|dia|mereka|tersebut|yang sama|sebelumnya|\w+nya|it|that|this|again|them|same|previous)\b"
+)
+# Ucapan orang pertama ("siapa nama saya?") jawabannya milik satu pengguna/sesi; cache dipakai lintas
+# sesi dan disimpan ke disk, jadi tidak boleh menyimpan atau melayaninya.
+_PERSONAL = re.compile(
+    r"\b(?:saya|aku|gue|gua|gw|kami|kita|punyaku|namaku|i|me|my|mine|myself|we|us|our|ours)\b"
+)
+# Jeda penulisan snapshot ke disk agar put() di jalur permintaan tidak menulis ulang file setiap kali.
+SAVE_DELAY_SECONDS = float(os.getenv("LLM_CACHE_SAVE_DELAY", "2"))
+
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"[^\w\s%]", " ", text)
+    return " ".join(text.split())
+
+
+def is_time_sensitive(text: str) -> bool:
+    return bool(_TIME_SENSITIVE.search(normalize_query(text)))
+
+
+def is_personal(text: str) -> bool:
+    return bool(_PERSONAL.search(normalize_query(text)))
+
+
+def is_cacheable(text: str) -> bool:
+    return not is_time_sensitive(text) and not is_personal(text)
+
+
+def history_fingerprint(text: str, recent_turns: list) -> str:
+    """Sidik jari riwayat yang relevan: kosong hanya di awal sesi.
+
+    Balasan seperti "ya", "boleh", atau "yang kedua" bergantung pada pertanyaan asisten sebelumnya
+    tanpa kata rujukan apa pun, jadi giliran asisten terakhir selalu ikut; ucapan dengan kata rujukan
+    memakai semua giliran terakhir.
+    """
+    if not recent_turns:
+        return ""
+    if _CONTEXT_DEPENDENT.search(normalize_query(text)):
+        turns = recent_turns
+    else:
+        turns = [turn for turn in recent_turns if turn[0] == "assistant"][-1:]
+    if not turns:
+        return ""
+    material = "\x1e".join(f"{role}\x1f{normalize_query(turn_text)}" for role, turn_text in turns)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    """Cache LRU dengan TTL untuk keputusan/jawaban LLM, opsional disimpan ke file JSON."""
+
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 512, persist_path: str = None,
+                 save_delay: float = SAVE_DELAY_SECONDS):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.save_delay = save_delay
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._load()
+        if self.persist_path:
+            atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(text: str, fingerprint: str = "", namespace: str = "") -> str:
+        material = "\x1f".join([namespace, normalize_query(text), fingerprint])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Gagal memuat cache respons dari {self.persist_path}: {e}")
+            return
+        now = time.time()
+        for key, (expires_at, value) in stored.items():
+            if expires_at > now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self, snapshot: dict):
+        if not self.persist_path:
+            return
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.persist_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            print(f"Gagal menyimpan cache respons: {e}")
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._schedule_save()
+
+    def _schedule_save(self):
+        # Dipanggil dengan _lock dipegang; beberapa put() dalam jeda yang sama digabung jadi satu tulisan.
+        self._dirty = True
+        if not self.persist_path or self._save_timer is not None:
+            return
+        self._save_timer = threading.Timer(self.save_delay, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def flush(self):
+        """Menulis snapshot yang tertunda ke disk sekarang (juga dipanggil saat proses keluar)."""
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                snapshot = dict(self._entries)
+            self._save(snapshot)
+
+    def note_bypass(self):
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "bypassed": self.bypassed}
+
+
+def cache_from_env(filename: str) -> ResponseCache:
+    persist = os.getenv("LLM_CACHE_PERSIST", "1") == "1"
+    return ResponseCache(
+        ttl_seconds=float(os.getenv("LLM_CACHE_TTL", str(24 * 3600))),
+        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+        persist_path=os.path.join("cache", filename) if persist else None
+    )
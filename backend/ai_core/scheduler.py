@@ -0,0 +1,263 @@
+# backend/ai_core/scheduler.py
+
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+from concurrent.futures import Future
+
+from ai_core import telemetry
+
+# Angka kecil dilayani lebih dulu: permintaan interaktif pendek mendahului render TTS panjang.
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BULK: "bulk"}
+
+QUEUE_WAIT_SECONDS = telemetry.metrics.histogram(
+    "kina_scheduler_queue_wait_seconds", "Waktu tunggu di antrean model sebelum inferensi dimulai.", ("model", "priority"))
+QUEUE_DEPTH = telemetry.metrics.gauge(
+    "kina_scheduler_queue_depth", "Jumlah pekerjaan yang sedang antre per model.", ("model",))
+RUNNING = telemetry.metrics.gauge(
+    "kina_scheduler_running", "Jumlah pekerjaan yang sedang dieksekusi per model.", ("model",))
+REJECTIONS = telemetry.metrics.counter(
+    "kina_scheduler_rejections_total", "Pekerjaan yang ditolak atau kedaluwarsa sebelum dieksekusi.", ("model", "reason"))
+
+
+class SchedulerBusy(Exception):
+    """Antrean model penuh, perkiraan tunggu melebihi tenggat, atau tenggat lewat saat antre."""
+
+    def __init__(self, model: str, reason: str, retry_after: float):
+        self.model = model
+        self.reason = reason
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        super().__init__(f"Antrean model '{model}' sibuk ({reason}); coba lagi dalam {self.retry_after} detik.")
+
+
+def _env_number(name: str, default, cast=int):
+    value = os.getenv(name)
+    return cast(value) if value else default
+
+
+def device_limits() -> dict:
+    """Batas eksekusi bersamaan per perangkat lintas model, mis. SCHED_DEVICE_LIMITS="cuda=1,cpu=4"."""
+    limits = {}
+    for item in os.getenv("SCHED_DEVICE_LIMITS", "").split(","):
+        device, _, value = item.partition("=")
+        if device.strip() and value.strip():
+            limits[device.strip()] = int(value)
+    return limits
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "fn", "args", "kwargs", "future", "enqueued", "deadline", "context")
+
+    def __init__(self, priority, seq, fn, args, kwargs, deadline):
+        self.priority = priority
+        self.seq = seq
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+        self.deadline = deadline
+        # Trace aktif ikut ke thread worker supaya span inferensi tetap tercatat pada giliran yang benar.
+        self.context = contextvars.copy_context()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class ModelLane:
+    """Antrean prioritas terbatas dengan worker khusus untuk satu model.
+
+    `concurrency` dan `device` boleh berupa callable yang baru dievaluasi saat pekerjaan pertama
+    masuk, karena modelnya sendiri dimuat di latar belakang.
+    """
+
+    def __init__(self, name: str, concurrency=1, max_queue: int = 16, deadline: float = None,
+                 device=None, device_slots: dict = None):
+        self.name = name
+        self._concurrency = concurrency
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self._device = device
+        self._device_slots = device_slots if device_slots is not None else {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._slot = None
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        # Rata-rata bergerak lama eksekusi, dipakai untuk memperkirakan waktu tunggu dan Retry-After.
+        self.service_seconds = None
+
+    @property
+    def concurrency(self) -> int:
+        value = self._concurrency() if callable(self._concurrency) else self._concurrency
+        return max(1, int(value))
+
+    @property
+    def device(self):
+        return self._device() if callable(self._device) else self._device
+
+    def _start_workers(self):
+        self._concurrency = self.concurrency
+        device = self.device
+        self._device = device
+        self._slot = self._device_slots.get(device)
+        for index in range(self._concurrency):
+            worker = threading.Thread(target=self._run, name=f"sched-{self.name}-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def estimated_wait(self, priority: int = NORMAL) -> float:
+        """Perkiraan kasar: pekerjaan di depan (prioritas sama/lebih tinggi) x lama eksekusi rata-rata."""
+        if not self._workers:
+            return 0.0
+        ahead = sum(1 for job in self._heap if job.priority <= priority)
+        busy = max(0, self.running + ahead - self.concurrency + 1)
+        return busy * (self.service_seconds or 0.0) / self.concurrency
+
+    def submit(self, fn, *args, priority: int = NORMAL, deadline: float = None, admitted: bool = False, **kwargs) -> Future:
+        """Memasukkan pekerjaan ke antrean; gagal cepat dengan SchedulerBusy bila tidak mungkin dilayani tepat waktu.
+
+        `admitted=True` untuk kelanjutan pekerjaan yang sudah diterima (mis. potongan berikutnya dari
+        stream TTS) sehingga tidak ditolak di tengah respons yang sudah berjalan.
+        """
+        deadline = self.deadline if deadline is None else deadline
+        with self._cond:
+            if not self._workers:
+                self._start_workers()
+            if not admitted:
+                if len(self._heap) >= self.max_queue:
+                    self._reject("queue_full", self.estimated_wait(priority))
+                estimated = self.estimated_wait(priority)
+                if deadline is not None and estimated > deadline:
+                    self._reject("wait_too_long", estimated)
+            job = _Job(priority, next(self._seq), fn, args, kwargs, None if admitted else deadline)
+            heapq.heappush(self._heap, job)
+            QUEUE_DEPTH.set(len(self._heap), model=self.name)
+            self._cond.notify()
+        return job.future
+
+    def _reject(self, reason: str, retry_after: float):
+        self.rejected += 1
+        REJECTIONS.inc(model=self.name, reason=reason)
+        raise SchedulerBusy(self.name, reason, retry_after)
+
+    def _next_job(self) -> _Job:
+        with self._cond:
+            while not self._heap:
+                self._cond.wait()
+            job = heapq.heappop(self._heap)
+            QUEUE_DEPTH.set(len(self._heap), model=self.name)
+            return job
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            waited = time.perf_counter() - job.enqueued
+            QUEUE_WAIT_SECONDS.observe(waited, model=self.name, priority=PRIORITY_NAMES.get(job.priority, str(job.priority)))
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            if job.deadline is not None and waited > job.deadline:
+                # Klien kemungkinan sudah menyerah; GPU tidak dipakai untuk hasil yang tak akan dibaca.
+                with self._cond:
+                    self.expired += 1
+                    retry_after = self.estimated_wait(job.priority)
+                REJECTIONS.inc(model=self.name, reason="deadline")
+                job.future.set_exception(SchedulerBusy(self.name, "deadline", retry_after))
+                continue
+            self._execute(job, waited)
+
+    def _execute(self, job: _Job, waited: float):
+        with self._cond:
+            self.running += 1
+            RUNNING.set(self.running, model=self.name)
+        started = time.perf_counter()
+        try:
+            if self._slot is not None:
+                self._slot.acquire()
+            try:
+                result = job.context.run(self._call, job, waited)
+            finally:
+                if self._slot is not None:
+                    self._slot.release()
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._cond:
+                self.running -= 1
+                self.completed += 1
+                self.service_seconds = elapsed if self.service_seconds is None else 0.8 * self.service_seconds + 0.2 * elapsed
+                RUNNING.set(self.running, model=self.name)
+
+    def _call(self, job: _Job, waited: float):
+        trace = telemetry.current_trace()
+        if trace is not None:
+            trace.add_span(f"queue_{self.name}", job.enqueued, waited, priority=PRIORITY_NAMES.get(job.priority, job.priority))
+        return job.fn(*job.args, **job.kwargs)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "device": self.device if self._workers else None,
+                "concurrency": self.concurrency if self._workers else None,
+                "max_queue": self.max_queue,
+                "deadline_seconds": self.deadline,
+                "queued": len(self._heap),
+                "running": self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "mean_service_seconds": round(self.service_seconds, 4) if self.service_seconds is not None else None,
+                "estimated_wait_seconds": round(self.estimated_wait(), 4),
+            }
+
+
+class InferenceScheduler:
+    """Satu ModelLane per model, dengan batas perangkat bersama (mis. Whisper dan XTTS di satu GPU).
+
+    Setiap lane dapat ditimpa lewat lingkungan: SCHED_<MODEL>_CONCURRENCY, SCHED_<MODEL>_QUEUE,
+    dan SCHED_<MODEL>_DEADLINE_MS.
+    """
+
+    def __init__(self, device_slots: dict = None):
+        limits = device_limits() if device_slots is None else device_slots
+        self._device_slots = {device: threading.BoundedSemaphore(limit) for device, limit in limits.items()}
+        self.lanes = {}
+
+    def add_lane(self, name: str, concurrency=1, max_queue: int = 16, deadline: float = None, device=None) -> ModelLane:
+        prefix = f"SCHED_{name.upper()}_"
+        concurrency = _env_number(prefix + "CONCURRENCY", concurrency)
+        max_queue = _env_number(prefix + "QUEUE", max_queue)
+        deadline_ms = _env_number(prefix + "DEADLINE_MS", deadline * 1000 if deadline is not None else None, float)
+        lane = ModelLane(name, concurrency, max_queue, deadline_ms / 1000 if deadline_ms else None,
+                         device=device, device_slots=self._device_slots)
+        self.lanes[name] = lane
+        return lane
+
+    def device_slot(self, device):
+        """Semaphore bersama untuk perangkat, atau None bila perangkat itu tidak dibatasi."""
+        return self._device_slots.get(device)
+
+    def submit(self, model: str, fn, *args, **kwargs) -> Future:
+        return self.lanes[model].submit(fn, *args, **kwargs)
+
+    async def run(self, model: str, fn, *args, **kwargs):
+        """Versi async dari submit(); pembatalan dari sisi klien juga membatalkan pekerjaan yang masih antre."""
+        return await asyncio.wrap_future(self.submit(model, fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
@@ -1,25 +1,234 @@
 # backend/ai_core/stt.py
 
-import whisper
+import os
+import time
+import numpy as np
 
-# backend/ai_core/stt.py
+try:
+    import whisper
+    import torch
+except ImportError:
+    whisper, torch = None, None
 
-import whisper
-import numpy as np
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
 
-class SpeechToText:
-    def __init__(self, model_size="medium"):
-        print(f"Memuat model STT Whisper ({model_size})...")
+from ai_core import telemetry
+
+WHISPER_SAMPLE_RATE = 16000
+# Encoder Whisper selalu bekerja pada jendela mel 30 detik.
+WHISPER_WINDOW_SAMPLES = 30 * WHISPER_SAMPLE_RATE
+
+
+def _cuda_available() -> bool:
+    if torch is not None:
+        return torch.cuda.is_available()
+    try:
+        import ctranslate2
+        return ctranslate2.get_cuda_device_count() > 0
+    except ImportError:
+        return False
+
+
+class STTBackend:
+    """Antarmuka mesin STT. Implementasi menerima audio mono float32 16 kHz."""
+
+    name = "base"
+    device = "cpu"
+    supports_batching = False
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        raise NotImplementedError
+
+    def transcribe_batch(self, audios: list) -> list:
+        return [self.transcribe(audio) for audio in audios]
+
+    def configure_precision(self, fp16: bool):
+        pass
+
+
+class WhisperBackend(STTBackend):
+    """Whisper PyTorch asli (openai-whisper)."""
+
+    name = "whisper"
+    supports_batching = True
+
+    def __init__(self, model_size: str, fp16=None):
+        if whisper is None:
+            raise ImportError("Paket 'openai-whisper' tidak terpasang.")
         self.model = whisper.load_model(model_size)
-        print("Model STT Whisper berhasil dimuat.")
+        self.device = self.model.device.type
+        self.configure_precision(fp16)
+
+    def configure_precision(self, fp16: bool):
+        # fp16 hanya bermanfaat (dan didukung) di GPU; None berarti ikuti perangkat.
+        self.fp16 = (self.device == "cuda") if fp16 is None else (fp16 and self.device == "cuda")
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        result = self.model.transcribe(audio, language="id", fp16=self.fp16)
+        return result['text']
+
+    def transcribe_batch(self, audios: list) -> list:
+        texts = [""] * len(audios)
+        short_indices = []
+        for i, audio in enumerate(audios):
+            if audio.shape[0] <= WHISPER_WINDOW_SAMPLES:
+                short_indices.append(i)
+            else:
+                # Audio lebih dari 30 detik butuh jendela bergeser milik model.transcribe.
+                texts[i] = self.transcribe(audio)
+
+        if not short_indices:
+            return texts
+
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(torch.from_numpy(audios[i])),
+                n_mels=self.model.dims.n_mels
+            )
+            for i in short_indices
+        ]).to(self.model.device)
+        options = whisper.DecodingOptions(language="id", fp16=self.fp16, without_timestamps=True)
+        results = whisper.decode(self.model, mels, options)
+        for i, result in zip(short_indices, results):
+            texts[i] = result.text
+        return texts
+
+
+class FasterWhisperBackend(STTBackend):
+    """Whisper lewat CTranslate2 (faster-whisper), int8 di CPU dan float16 di GPU."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size: str, compute_type: str = None, cpu_threads: int = 0):
+        if WhisperModel is None:
+            raise ImportError("Paket 'faster-whisper' tidak terpasang.")
+        self.device = "cuda" if _cuda_available() else "cpu"
+        self.compute_type = compute_type or ("float16" if self.device == "cuda" else "int8")
+        self.model = WhisperModel(
+            model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=cpu_threads
+        )
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        segments, _ = self.model.transcribe(audio, language="id", beam_size=5)
+        return "".join(segment.text for segment in segments)
+
+
+STT_BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+class SpeechToText:
+    def __init__(self, model_size="medium", backend=None, fp16=None):
+        # STT_BACKEND: "auto" (int8 CPU bila tanpa GPU), "whisper", atau "faster-whisper".
+        backend = backend or os.getenv("STT_BACKEND", "auto")
+        if backend == "auto":
+            backend = "faster-whisper" if WhisperModel is not None and not _cuda_available() else "whisper"
+        if backend not in STT_BACKENDS:
+            raise ValueError(f"Backend STT '{backend}' tidak dikenal. Pilihan: {', '.join(STT_BACKENDS)}")
+
+        print(f"Memuat model STT {backend} ({model_size})...")
+        if backend == FasterWhisperBackend.name:
+            self.backend = FasterWhisperBackend(
+                model_size,
+                compute_type=os.getenv("STT_COMPUTE_TYPE") or None,
+                cpu_threads=int(os.getenv("STT_CPU_THREADS", "0"))
+            )
+        else:
+            self.backend = WhisperBackend(model_size, fp16=fp16)
+        print(f"Model STT {backend} berhasil dimuat di {self.device}.")
+
+    @property
+    def device(self) -> str:
+        return self.backend.device
+
+    @property
+    def supports_batching(self) -> bool:
+        return self.backend.supports_batching
+
+    def configure_precision(self, fp16: bool):
+        self.backend.configure_precision(fp16)
+
+    def warmup(self):
+        # Satu detik hening cukup untuk memicu inisialisasi kernel/graf sebelum permintaan nyata.
+        self.backend.transcribe(np.zeros(WHISPER_SAMPLE_RATE, dtype=np.float32))
 
     def transcribe(self, audio_data: np.ndarray) -> str:
         try:
-            audio_float32 = audio_data.astype(np.float32)
+            # Tanpa salinan bila audio sudah float32 (jalur ingest selalu menghasilkan float32).
+            audio_float32 = np.asarray(audio_data, dtype=np.float32)
 
-            result = self.model.transcribe(audio_float32, language="id", fp16=True)
-
-            return result['text']
+            audio_seconds = audio_float32.shape[0] / WHISPER_SAMPLE_RATE
+            with telemetry.stage("stt", backend=self.backend.name, audio_seconds=round(audio_seconds, 2)):
+                started = time.perf_counter()
+                text = self.backend.transcribe(audio_float32)
+            telemetry.observe_audio("stt", audio_seconds, time.perf_counter() - started)
+            return text
         except Exception as e:
             print(f"Error saat transkripsi audio: {e}")
-            return ""
\ No newline at end of file
+            return ""
+
+    def transcribe_batch(self, audios: list) -> list:
+        """Mentranskripsikan beberapa audio sekaligus bila backend mendukung batch."""
+        audios = [np.asarray(audio, dtype=np.float32) for audio in audios]
+        audio_seconds = sum(audio.shape[0] for audio in audios) / WHISPER_SAMPLE_RATE
+        try:
+            with telemetry.stage("stt_batch", backend=self.backend.name, batch_size=len(audios)):
+                started = time.perf_counter()
+                texts = self.backend.transcribe_batch(audios)
+            telemetry.observe_audio("stt", audio_seconds, time.perf_counter() - started)
+            return texts
+        except Exception as e:
+            print(f"Error saat transkripsi batch, beralih ke satu per satu: {e}")
+            return [self.transcribe(audio) for audio in audios]
+
+
+class StreamingTranscriber:
+    """Menampung frame PCM 16 kHz selama perekaman dan mendekode Whisper secara bertahap."""
+
+    def __init__(self, stt: SpeechToText, partial_interval: float = 1.0, window_seconds: float = 30.0):
+        self.stt = stt
+        self.partial_samples = int(partial_interval * WHISPER_SAMPLE_RATE)
+        self.window_samples = int(window_seconds * WHISPER_SAMPLE_RATE)
+        self._buffer = np.empty(self.window_samples, dtype=np.float32)
+        self._length = 0
+        self._decoded_length = 0
+
+    def feed(self, pcm_bytes: bytes):
+        # Frame mentah int16 little-endian mono, langsung dinormalisasi ke float32.
+        frame = np.frombuffer(pcm_bytes, dtype="<i2")
+        needed = self._length + frame.size
+        if needed > self._buffer.size:
+            grown = np.empty(max(needed, self._buffer.size * 2), dtype=np.float32)
+            grown[:self._length] = self._buffer[:self._length]
+            self._buffer = grown
+        np.multiply(frame, 1.0 / 32768.0, out=self._buffer[self._length:needed], casting="unsafe")
+        self._length = needed
+
+    @property
+    def duration(self) -> float:
+        return self._length / WHISPER_SAMPLE_RATE
+
+    def partial_due(self) -> bool:
+        return self._length - self._decoded_length >= self.partial_samples
+
+    def transcribe_partial(self) -> str:
+        # Hanya jendela terakhir (maks. 30 detik) yang didekode agar biaya per parsial tetap.
+        end = self._length
+        start = max(0, end - self.window_samples)
+        self._decoded_length = end
+        if end == 0:
+            return ""
+        return self.stt.transcribe(self._buffer[start:end])
+
+    def transcribe_final(self) -> str:
+        if self._length == 0:
+            return ""
+        return self.stt.transcribe(self._buffer[:self._length])
@@ -0,0 +1,118 @@
+# backend/ai_core/stt_batcher.py
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+
+from ai_core import telemetry
+
+# Nilai bawaan per perangkat; masing-masing bisa ditimpa lewat variabel lingkungan.
+DEVICE_DEFAULTS = {
+    "cuda": {"max_batch_size": 8, "max_wait_ms": 25.0, "fp16": True},
+    "cpu": {"max_batch_size": 4, "max_wait_ms": 10.0, "fp16": False},
+}
+
+
+def batch_settings(device: str) -> dict:
+    settings = dict(DEVICE_DEFAULTS.get(device, DEVICE_DEFAULTS["cpu"]))
+    prefix = f"STT_{device.upper()}_"
+    if os.getenv(prefix + "BATCH_SIZE"):
+        settings["max_batch_size"] = int(os.getenv(prefix + "BATCH_SIZE"))
+    if os.getenv(prefix + "BATCH_WAIT_MS"):
+        settings["max_wait_ms"] = float(os.getenv(prefix + "BATCH_WAIT_MS"))
+    if os.getenv(prefix + "FP16"):
+        settings["fp16"] = os.getenv(prefix + "FP16") == "1"
+    return settings
+
+
+class BatchingTranscriber:
+    """Mengumpulkan permintaan transkripsi selama jendela singkat lalu menjalankannya sebagai satu batch."""
+
+    def __init__(self, stt, max_batch_size: int = 8, max_wait_ms: float = 25.0):
+        self.stt = stt
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        # Semaphore perangkat bersama (mis. SCHED_DEVICE_LIMITS), diambil hanya selama panggilan model.
+        self.device_slot = None
+        self.batches_run = 0
+        self.requests_served = 0
+        self._worker = threading.Thread(target=self._run, name="stt-batcher", daemon=True)
+        self._worker.start()
+        print(f"Batching STT aktif (batch maks. {max_batch_size}, tunggu {max_wait_ms} ms).")
+
+    def __getattr__(self, name):
+        # Atribut lain (backend, device, ...) diteruskan ke SpeechToText yang dibungkus.
+        return getattr(self.stt, name)
+
+    def submit(self, audio_data: np.ndarray) -> Future:
+        future = Future()
+        self._queue.put((audio_data, future))
+        return future
+
+    def transcribe(self, audio_data: np.ndarray) -> str:
+        # Waktu komputasi dicatat oleh worker; di sini hanya span trace termasuk waktu antre.
+        with telemetry.span("stt", batched=True):
+            return self.submit(audio_data).result()
+
+    def _collect_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            batch = [(audio, future) for audio, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                texts = self._transcribe_batch([audio for audio, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches_run += 1
+            self.requests_served += len(batch)
+            for (_, future), text in zip(batch, texts):
+                future.set_result(text)
+
+    def _transcribe_batch(self, audios: list) -> list:
+        slot = self.device_slot
+        if slot is not None:
+            slot.acquire()
+        try:
+            if len(audios) == 1:
+                return [self.stt.transcribe(audios[0])]
+            return self.stt.transcribe_batch(audios)
+        finally:
+            if slot is not None:
+                slot.release()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "batches_run": self.batches_run,
+            "requests_served": self.requests_served,
+            "mean_batch_size": self.requests_served / self.batches_run if self.batches_run else 0.0,
+        }
+
+
+def build_transcriber(stt):
+    """Menerapkan presisi per perangkat dan membungkus STT dengan batcher bila batch > 1."""
+    settings = batch_settings(stt.device)
+    stt.configure_precision(settings["fp16"])
+    if settings["max_batch_size"] <= 1 or not stt.supports_batching:
+        return stt
+    return BatchingTranscriber(stt, max_batch_size=settings["max_batch_size"], max_wait_ms=settings["max_wait_ms"])
@@ -0,0 +1,254 @@
+# backend/ai_core/telemetry.py
+
+import os
+import json
+import time
+import uuid
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Tulis satu baris JSON per giliran ke file ini, mis. TRACE_LOG_PATH=logs/traces.jsonl.
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH")
+TRACE_HEADER = "X-Trace-Id"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RTF_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label -> [hitungan per bucket (non-kumulatif, + bucket +Inf), jumlah, cacah]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total:.6f}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Format teks eksposisi Prometheus (text/plain; version=0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    "kina_stage_duration_seconds", "Durasi tiap tahap pemrosesan giliran.", ("stage",))
+STAGE_ERRORS = metrics.counter(
+    "kina_stage_errors_total", "Jumlah tahap yang berakhir dengan exception.", ("stage",))
+AUDIO_SECONDS = metrics.counter(
+    "kina_audio_seconds_total", "Detik audio yang diproses (stt) atau dihasilkan (tts).", ("kind",))
+REAL_TIME_FACTOR = metrics.histogram(
+    "kina_real_time_factor", "Waktu komputasi dibagi durasi audio.", ("kind",), buckets=RTF_BUCKETS)
+REQUEST_SECONDS = metrics.histogram(
+    "kina_http_request_duration_seconds", "Durasi permintaan HTTP hingga body selesai dikirim.", ("path", "status"))
+EVENTS = metrics.counter(
+    "kina_events_total", "Kejadian penting: rute dialog, cache hit/miss, aksi, dsb.", ("event", "value"))
+
+
+class Trace:
+    """Rangkaian span untuk satu giliran, diidentifikasi oleh trace id dari klien."""
+
+    def __init__(self, trace_id: str = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.spans = []
+        self.attributes = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, duration: float, **attributes):
+        span = {"name": name, "start_ms": round((start - self._started) * 1000, 2), "duration_ms": round(duration * 1000, 2)}
+        span.update(attributes)
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "timestamp": self.started_at,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 2),
+            "attributes": dict(self.attributes),
+            "spans": spans,
+        }
+
+
+_current_trace = contextvars.ContextVar("kina_trace", default=None)
+_trace_log_lock = threading.Lock()
+
+
+def start_trace(trace_id: str = None) -> Trace:
+    trace = Trace(trace_id)
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def finish_trace(trace: Trace):
+    if trace is None or not TRACE_LOG_PATH:
+        return
+    record = json.dumps(trace.to_dict(), ensure_ascii=False)
+    try:
+        directory = os.path.dirname(TRACE_LOG_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _trace_log_lock, open(TRACE_LOG_PATH, 'a', encoding='utf-8') as f:
+            f.write(record + "\n")
+    except OSError as e:
+        print(f"Gagal menulis trace {trace.trace_id}: {e}")
+
+
+def record_stage(name: str, seconds: float, trace: Trace = None, start: float = None, **attributes):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    trace = trace or current_trace()
+    if trace is not None:
+        trace.add_span(name, start if start is not None else time.perf_counter() - seconds, seconds, **attributes)
+
+
+@contextmanager
+def stage(name: str, **attributes):
+    """Mengukur satu tahap: histogram Prometheus + span pada trace aktif.
+
+    Dict yang di-yield boleh diisi atribut tambahan (mis. hasil cache) selama tahap berjalan.
+    """
+    started = time.perf_counter()
+    try:
+        yield attributes
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        attributes["error"] = True
+        raise
+    finally:
+        record_stage(name, time.perf_counter() - started, start=started, **attributes)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Seperti stage(), tetapi hanya dicatat pada trace (tanpa histogram) untuk menghindari hitungan ganda."""
+    started = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        trace = current_trace()
+        if trace is not None:
+            trace.add_span(name, started, time.perf_counter() - started, **attributes)
+
+
+def observe_audio(kind: str, audio_seconds: float, compute_seconds: float):
+    if audio_seconds <= 0:
+        return
+    AUDIO_SECONDS.inc(audio_seconds, kind=kind)
+    REAL_TIME_FACTOR.observe(compute_seconds / audio_seconds, kind=kind)
+
+
+def count_event(event: str, value: str = ""):
+    EVENTS.inc(event=event, value=value)
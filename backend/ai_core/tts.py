@@ -1,21 +1,150 @@
-from TTS.api import TTS
-import torch
 import os
+import io
+import hashlib
+import re
+import time
+import numpy as np
+import soundfile as sf
 
-from TTS.tts.configs.xtts_config import XttsConfig
-from TTS.tts.models.xtts import XttsAudioConfig
-from TTS.config.shared_configs import BaseDatasetConfig
-from TTS.tts.models.xtts import XttsArgs 
-from torch.serialization import add_safe_globals
+# Coqui TTS/torch opsional saat impor supaya helper audio (to_pcm16, split_sentences) dan server
+# dengan model tiruan tetap bisa dipakai tanpa tumpukan model.
+try:
+    import torch
+    from TTS.api import TTS
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models.xtts import XttsAudioConfig
+    from TTS.config.shared_configs import BaseDatasetConfig
+    from TTS.tts.models.xtts import XttsArgs
+    from torch.serialization import add_safe_globals
+except ImportError:
+    torch, TTS = None, None
 
-add_safe_globals([XttsConfig, XttsAudioConfig, BaseDatasetConfig, XttsArgs])
+from ai_core import telemetry
+from ai_core.tts_cache import AudioCache
+
+if TTS is not None:
+    add_safe_globals([XttsConfig, XttsAudioConfig, BaseDatasetConfig, XttsArgs])
+
+SPEAKER_SAMPLE_PATH = "youtube_voice.wav"
+LATENT_CACHE_DIR = os.path.join("cache", "speaker_latents")
+AUDIO_CACHE_DIR = os.path.join("cache", "tts_audio")
+AUDIO_CACHE_MAX_ITEMS = int(os.getenv("TTS_CACHE_MAX_ITEMS", "128"))
+AUDIO_CACHE_MAX_DISK_MB = int(os.getenv("TTS_CACHE_MAX_DISK_MB", "256"))
+# Batas karakter per potongan yang masih nyaman untuk konteks XTTS.
+MAX_CHUNK_CHARS = 200
+
+# Profil inferensi: jumlah thread, kuantisasi int8 dinamis lapisan linear GPT, dan torch.compile decoder.
+# TTS_PROFILE memilih profil (auto = "cpu" atau "gpu" sesuai perangkat); TTS_THREADS, TTS_INTEROP_THREADS,
+# TTS_QUANTIZE, dan TTS_COMPILE menimpa nilai profil.
+# Default CPU: kira-kira jumlah core fisik (hyper-threading jarang membantu GEMM).
+_CPU_THREADS = max(1, (os.cpu_count() or 2) // 2)
+INFERENCE_PROFILES = {
+    "gpu": {"threads": None, "interop_threads": None, "quantize": False, "compile": False},
+    "cpu": {"threads": _CPU_THREADS, "interop_threads": 1, "quantize": False, "compile": False},
+    "cpu-int8": {"threads": _CPU_THREADS, "interop_threads": 1, "quantize": True, "compile": False},
+    "cpu-int8-compile": {"threads": _CPU_THREADS, "interop_threads": 1, "quantize": True, "compile": True},
+}
+
+FIRST_AUDIO_SECONDS = telemetry.metrics.histogram(
+    "kina_tts_first_audio_seconds", "Waktu hingga potongan audio TTS pertama siap (streaming).")
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+
+def split_sentences(text: str, max_chars: int = MAX_CHUNK_CHARS) -> list:
+    """Memecah teks menjadi kalimat, lalu klausa/kata bila kalimat masih terlalu panjang."""
+    chunks = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            chunks.append(sentence)
+            continue
+        current = ""
+        for clause in _CLAUSE_END.split(sentence):
+            for word in clause.split():
+                if current and len(current) + 1 + len(word) > max_chars:
+                    chunks.append(current)
+                    current = word
+                else:
+                    current = f"{current} {word}" if current else word
+            # Batas klausa adalah titik potong yang wajar jika potongan sudah cukup panjang.
+            if current and len(current) >= max_chars // 2:
+                chunks.append(current)
+                current = ""
+        if current:
+            chunks.append(current)
+    return chunks
+
+
+def pack_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS) -> list:
+    """Kalimat digabung serakah hingga max_chars: sesedikit mungkin panggilan model, tetap muat konteks XTTS."""
+    chunks = []
+    for sentence in split_sentences(text, max_chars):
+        if chunks and len(chunks[-1]) + 1 + len(sentence) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {sentence}"
+        else:
+            chunks.append(sentence)
+    return chunks
+
+
+def inference_profile(name: str = None, device: str = "cpu") -> dict:
+    name = name or os.getenv("TTS_PROFILE", "auto")
+    if name == "auto":
+        name = "gpu" if device == "cuda" else "cpu"
+    if name not in INFERENCE_PROFILES:
+        raise ValueError(f"Profil TTS '{name}' tidak dikenal; pilihan: {', '.join(INFERENCE_PROFILES)}")
+    profile = dict(INFERENCE_PROFILES[name], name=name)
+    if os.getenv("TTS_THREADS"):
+        profile["threads"] = int(os.getenv("TTS_THREADS"))
+    if os.getenv("TTS_INTEROP_THREADS"):
+        profile["interop_threads"] = int(os.getenv("TTS_INTEROP_THREADS"))
+    if os.getenv("TTS_QUANTIZE"):
+        profile["quantize"] = os.getenv("TTS_QUANTIZE") == "1"
+    if os.getenv("TTS_COMPILE"):
+        profile["compile"] = os.getenv("TTS_COMPILE") == "1"
+    return profile
+
+
+def _conv1d_to_linear(module):
+    # GPT-2 (inti GPT XTTS) memakai Conv1D transformers, bukan nn.Linear, sehingga tidak tersentuh
+    # quantize_dynamic. Conv1D setara Linear dengan bobot transpos; diganti di tempat agar referensi
+    # bersama (mis. gpt_inference) ikut memakai modul baru.
+    for name, child in list(module.named_children()):
+        if type(child).__name__ == "Conv1D" and hasattr(child, "nf"):
+            linear = torch.nn.Linear(child.weight.shape[0], child.nf)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            _conv1d_to_linear(child)
+
+
+def to_pcm16(wav: np.ndarray) -> bytes:
+    return (np.clip(wav, -1.0, 1.0) * 32767).astype("<i2").tobytes()
 
 class TextToSpeech:
-    def __init__(self):
+    def __init__(self, profile: str = None):
+        if TTS is None:
+            raise ImportError("Paket 'TTS' (Coqui) dan 'torch' tidak terpasang.")
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Memuat model TTS (Coqui TTS) ke {self.device}...")
-        
+        self.profile = inference_profile(profile, self.device)
+        # Presisi yang benar-benar diterapkan (kuantisasi dilewati di GPU); ikut menjadi kunci cache audio.
+        self.precision = "fp32"
+        print(f"Memuat model TTS (Coqui TTS) ke {self.device} (profil {self.profile['name']})...")
+
         self.model_name = "tts_models/multilingual/multi-dataset/xtts_v2"
+        self.language = "en"
+        # Hash isi file sampel di-cache per (mtime, ukuran) agar file tidak dibaca ulang setiap panggilan.
+        self._speaker_hashes = {}
+        self._latents_cache = {}
+        self.audio_cache = AudioCache(
+            AUDIO_CACHE_DIR,
+            max_memory_items=AUDIO_CACHE_MAX_ITEMS,
+            max_disk_bytes=AUDIO_CACHE_MAX_DISK_MB << 20
+        )
         try:
             self.tts = TTS(self.model_name).to(self.device)
             print("Model TTS berhasil dimuat.")
@@ -23,26 +152,248 @@ class TextToSpeech:
             print(f"Gagal memuat model TTS: {e}. Fitur TTS mungkin tidak berfungsi.")
             self.tts = None
 
-    def synthesize(self, text: str, output_path: str):
-        if not self.tts:
-            print("Model TTS tidak tersedia.")
+        if self.tts:
+            self._apply_profile()
+
+        if self.tts and os.path.exists(SPEAKER_SAMPLE_PATH):
+            try:
+                self._get_conditioning_latents()
+            except Exception as e:
+                print(f"Gagal menyiapkan latent pembicara saat startup: {e}")
+
+    def _apply_profile(self):
+        profile = self.profile
+        # Pengaturan thread berlaku untuk seluruh proses (termasuk Whisper); interop hanya bisa diset sekali.
+        if profile["threads"]:
+            torch.set_num_threads(profile["threads"])
+        if profile["interop_threads"]:
+            try:
+                torch.set_num_interop_threads(profile["interop_threads"])
+            except RuntimeError as e:
+                print(f"Thread interop TTS tidak diubah: {e}")
+
+        model = self._xtts_model()
+        if model is None:
+            return
+        if profile["quantize"]:
+            if self.device != "cpu":
+                print("Kuantisasi int8 dinamis hanya untuk CPU; dilewati.")
+            else:
+                _conv1d_to_linear(model.gpt)
+                torch.ao.quantization.quantize_dynamic(model.gpt, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+                self.precision = "int8"
+                print("Lapisan linear GPT XTTS dikuantisasi ke int8.")
+        if profile["compile"] and hasattr(torch, "compile"):
+            # Hanya decoder HiFi-GAN: loop autoregresif GPT memicu kompilasi ulang untuk tiap panjang.
+            try:
+                model.hifigan_decoder = torch.compile(model.hifigan_decoder, dynamic=True)
+                print("Decoder XTTS dikompilasi dengan torch.compile.")
+            except Exception as e:
+                print(f"torch.compile gagal, memakai mode eager: {e}")
+
+    def warmup(self):
+        if not self.tts or not os.path.exists(SPEAKER_SAMPLE_PATH):
             return
+        # Melewati cache audio dan metrik supaya inferensi benar-benar dijalankan sekali tanpa mencemari RTF.
+        self._infer_uninstrumented("Halo.")
 
-        speaker_sample_path = "youtube_voice.wav"
+    @property
+    def sample_rate(self) -> int:
+        return self.tts.synthesizer.output_sample_rate
+
+    def _get_speaker_sample(self) -> str:
+        speaker_sample_path = SPEAKER_SAMPLE_PATH
 
         if not os.path.exists(speaker_sample_path):
             print(f"Error: File sampel suara '{speaker_sample_path}' tidak ditemukan.")
             raise FileNotFoundError(f"File sampel suara '{speaker_sample_path}' tidak ditemukan.")
+        return speaker_sample_path
+
+    def _speaker_hash(self, speaker_sample_path: str) -> str:
+        stat = os.stat(speaker_sample_path)
+        key = (speaker_sample_path, stat.st_mtime_ns, stat.st_size)
+        if key not in self._speaker_hashes:
+            digest = hashlib.sha256()
+            with open(speaker_sample_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            self._speaker_hashes[key] = digest.hexdigest()
+        return self._speaker_hashes[key]
+
+    def _xtts_model(self):
+        model = getattr(self.tts.synthesizer, "tts_model", None)
+        if model is not None and hasattr(model, "get_conditioning_latents") and hasattr(model, "inference"):
+            return model
+        return None
+
+    def _get_conditioning_latents(self):
+        speaker_sample_path = self._get_speaker_sample()
+        speaker_hash = self._speaker_hash(speaker_sample_path)
+
+        if speaker_hash in self._latents_cache:
+            return self._latents_cache[speaker_hash]
+
+        model = self._xtts_model()
+        if model is None:
+            return None
+
+        cache_path = os.path.join(LATENT_CACHE_DIR, f"{speaker_hash}.pt")
+        if os.path.exists(cache_path):
+            try:
+                cached = torch.load(cache_path, map_location=self.device)
+                latents = (cached["gpt_cond_latent"], cached["speaker_embedding"])
+                self._latents_cache[speaker_hash] = latents
+                print(f"Latent pembicara dimuat dari cache: {cache_path}")
+                return latents
+            except Exception as e:
+                print(f"Cache latent pembicara rusak, menghitung ulang: {e}")
+
+        print(f"Menghitung latent pembicara dari '{speaker_sample_path}'...")
+        with torch.inference_mode():
+            gpt_cond_latent, speaker_embedding = model.get_conditioning_latents(audio_path=[speaker_sample_path])
+        latents = (gpt_cond_latent, speaker_embedding)
+        self._latents_cache[speaker_hash] = latents
 
         try:
-            self.tts.tts_to_file(
-                text=text,
-                file_path=output_path,
-                speaker_wav=speaker_sample_path,
-                language="en" 
+            os.makedirs(LATENT_CACHE_DIR, exist_ok=True)
+            torch.save(
+                {"gpt_cond_latent": gpt_cond_latent.cpu(), "speaker_embedding": speaker_embedding.cpu()},
+                cache_path
             )
+        except OSError as e:
+            print(f"Gagal menyimpan cache latent pembicara: {e}")
+        return latents
+
+    def _infer(self, text: str) -> np.ndarray:
+        started = time.perf_counter()
+        with telemetry.stage("tts_infer", chars=len(text)):
+            wav = self._infer_uninstrumented(text)
+        telemetry.observe_audio("tts", wav.shape[0] / self.sample_rate, time.perf_counter() - started)
+        return wav
+
+    def _infer_uninstrumented(self, text: str) -> np.ndarray:
+        # Teks panjang dipecah agar tiap panggilan muat dalam konteks model, lalu audionya disambung.
+        chunks = pack_chunks(text)
+        if len(chunks) > 1:
+            return np.concatenate([self._infer_chunk(chunk) for chunk in chunks])
+        return self._infer_chunk(text)
+
+    def _infer_chunk(self, text: str) -> np.ndarray:
+        latents = self._get_conditioning_latents()
+        if latents is None:
+            # Model non-XTTS: gunakan API umum yang memproses sampel suara setiap kali.
+            with torch.inference_mode():
+                wav = self.tts.tts(text=text, speaker_wav=self._get_speaker_sample(), language=self.language)
+            return np.asarray(wav, dtype=np.float32)
+
+        gpt_cond_latent, speaker_embedding = latents
+        with torch.inference_mode():
+            out = self._xtts_model().inference(text, self.language, gpt_cond_latent, speaker_embedding)
+        wav = out["wav"]
+        if torch.is_tensor(wav):
+            wav = wav.cpu().numpy()
+        return np.asarray(wav, dtype=np.float32)
+
+    def _cache_key(self, text: str) -> str:
+        speaker_hash = self._speaker_hash(self._get_speaker_sample())
+        # Audio int8 dan fp32 tidak boleh saling menggantikan, kalau tidak beda kualitas antar profil tersamar.
+        return AudioCache.make_key(text, speaker_hash, self.language, self.model_name,
+                                   f"{self.profile['name']}:{self.precision}")
+
+    def _infer_cached(self, text: str) -> np.ndarray:
+        key = self._cache_key(text)
+        wav = self.audio_cache.get(key)
+        telemetry.count_event("tts_audio_cache", "miss" if wav is None else "hit")
+        if wav is None:
+            wav = self._infer(text)
+            self.audio_cache.put(key, wav)
+        return wav
+
+    def synthesize_stream(self, text: str, first_audio: bool = True):
+        """Generator potongan audio float32 per kalimat, memakai inference_stream XTTS bila ada.
+
+        first_audio=False untuk kalimat lanjutan dari jawaban yang sama (mis. dari LLM streaming),
+        supaya histogram waktu-ke-audio-pertama hanya mencatat awal giliran.
+        """
+        if not self.tts:
+            print("Model TTS tidak tersedia.")
+            return
+
+        # Generator ini dilanjutkan dari thread lain, jadi trace ditangkap sekali di awal.
+        trace = telemetry.current_trace()
+        started = time.perf_counter()
+        key = self._cache_key(text)
+        cached = self.audio_cache.get(key)
+        telemetry.count_event("tts_audio_cache", "miss" if cached is None else "hit")
+        if cached is not None:
+            if first_audio:
+                self._record_first_audio(trace, started, cached=True)
+            yield cached
+            return
+
+        rendered = []
+        for chunk in self._stream_sentences(text):
+            if not rendered and first_audio:
+                self._record_first_audio(trace, started, cached=False)
+            rendered.append(chunk)
+            yield chunk
+        if rendered:
+            audio = np.concatenate(rendered)
+            elapsed = time.perf_counter() - started
+            telemetry.record_stage("tts_stream", elapsed, trace=trace, start=started, chunks=len(rendered))
+            telemetry.observe_audio("tts", audio.shape[0] / self.sample_rate, elapsed)
+            self.audio_cache.put(key, audio)
+
+    def _record_first_audio(self, trace, started: float, cached: bool):
+        elapsed = time.perf_counter() - started
+        FIRST_AUDIO_SECONDS.observe(elapsed)
+        if trace is not None:
+            trace.add_span("tts_first_audio", started, elapsed, cached=cached)
+
+    def _stream_sentences(self, text: str):
+        latents = self._get_conditioning_latents()
+        model = self._xtts_model()
+        for sentence in split_sentences(text):
+            if latents is None or not hasattr(model, "inference_stream"):
+                yield self._infer_uninstrumented(sentence)
+                continue
+            gpt_cond_latent, speaker_embedding = latents
+            stream = model.inference_stream(sentence, self.language, gpt_cond_latent, speaker_embedding)
+            while True:
+                # Generator bisa dilanjutkan dari thread lain (StreamingResponse), jadi
+                # inference_mode dipasang per langkah, bukan di sekitar yield.
+                with torch.inference_mode():
+                    chunk = next(stream, None)
+                if chunk is None:
+                    break
+                yield chunk.cpu().numpy().astype(np.float32, copy=False)
+
+    def synthesize(self, text: str, output_path: str):
+        if not self.tts:
+            print("Model TTS tidak tersedia.")
+            return
+
+        try:
+            wav = self._infer_cached(text)
+            sf.write(output_path, wav, self.sample_rate)
             print(f"Audio berhasil disimpan di {output_path}")
         except Exception as e:
             print(f"Tipe error saat sintesis: {type(e)}")
             print(f"Error saat sintesis ucapan dengan Coqui TTS: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    def synthesize_to_bytes(self, text: str) -> bytes:
+        """Menghasilkan ucapan langsung sebagai bytes WAV tanpa menulis ke disk."""
+        if not self.tts:
+            print("Model TTS tidak tersedia.")
+            return b""
+
+        try:
+            wav = self._infer_cached(text)
+            buffer = io.BytesIO()
+            sf.write(buffer, wav, self.sample_rate, format="WAV", subtype="PCM_16")
+            return buffer.getvalue()
+        except Exception as e:
+            print(f"Tipe error saat sintesis: {type(e)}")
+            print(f"Error saat sintesis ucapan dengan Coqui TTS: {e}")
+            raise e
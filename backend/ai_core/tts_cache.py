@@ -0,0 +1,146 @@
+# backend/ai_core/tts_cache.py
+
+import os
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class AudioCache:
+    """Cache audio hasil sintesis: tier LRU di memori dan tier disk dengan batas ukuran."""
+
+    def __init__(self, cache_dir: str, max_memory_items: int = 128, max_memory_bytes: int = 64 << 20,
+                 max_disk_bytes: int = 256 << 20):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = OrderedDict()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._scan_disk()
+
+    @staticmethod
+    def make_key(text: str, speaker_hash: str, language: str, model_name: str, profile: str = "") -> str:
+        material = "\x1f".join([normalize_text(text), speaker_hash, language, model_name, profile])
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _scan_disk(self):
+        if self.max_disk_bytes <= 0 or not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+        # Urutan LRU awal mengikuti waktu modifikasi file.
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key: str):
+        with self._lock:
+            wav = self._memory.get(key)
+            if wav is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return wav
+            on_disk = key in self._disk
+
+        if on_disk:
+            try:
+                wav = np.load(self._disk_path(key))
+                wav.setflags(write=False)
+            except (OSError, ValueError):
+                wav = None
+            with self._lock:
+                if wav is not None:
+                    self.disk_hits += 1
+                    self._disk.move_to_end(key)
+                    self._store_memory(key, wav)
+                    return wav
+                self._drop_disk(key)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, wav: np.ndarray):
+        wav = np.ascontiguousarray(wav, dtype=np.float32)
+        wav.setflags(write=False)
+        with self._lock:
+            self._store_memory(key, wav)
+            if self.max_disk_bytes <= 0 or key in self._disk:
+                return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._disk_path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, wav)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            print(f"Gagal menyimpan audio ke cache disk: {e}")
+            return
+        with self._lock:
+            if key in self._disk:
+                return
+            size = os.path.getsize(self._disk_path(key))
+            self._disk[key] = size
+            self._disk_bytes += size
+            self._evict_disk()
+
+    def _store_memory(self, key: str, wav: np.ndarray):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        if wav.nbytes > self.max_memory_bytes:
+            return
+        self._memory[key] = wav
+        self._memory_bytes += wav.nbytes
+        while len(self._memory) > self.max_memory_items or self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _drop_disk(self, key: str):
+        size = self._disk.pop(key, None)
+        if size is None:
+            return
+        self._disk_bytes -= size
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        while self._disk and self._disk_bytes > self.max_disk_bytes:
+            self._drop_disk(next(iter(self._disk)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
@@ -1,22 +1,34 @@
 # backend/app.py
 
 import os
+import re
+import asyncio
+import json
+import time
+import uuid
 import uvicorn
-from fastapi import FastAPI, File, UploadFile, HTTPException, Body
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Body, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, List, Optional
+from starlette.routing import Match
 import numpy as np
 import soundfile as sf
 import io
+import base64
+from urllib.parse import quote
 
-from ai_core.stt import SpeechToText
-from ai_core.nlu import NLU
-from ai_core.dialogue_manager import DialogueManager
-from ai_core.action_executor import ActionExecutor
-from ai_core.tts import TextToSpeech
+from ai_core.stt import StreamingTranscriber
+from ai_core.tts import to_pcm16
+from ai_core.model_manager import ModuleNotReady
+from ai_core.pipeline import (
+    TEXT_MODULES, build_modules, build_scheduler, run_dialogue_pipeline, run_dialogue_pipeline_stream, turn_result
+)
+from ai_core.scheduler import SchedulerBusy, INTERACTIVE, BULK
+from ai_core.audio_ingest import AudioDecodeError, decode_audio, TARGET_SAMPLE_RATE
+from ai_core import telemetry
 
 print("--- Memulai Inisialisasi Backend Asisten AI ---")
 app = FastAPI(
@@ -33,76 +45,420 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Audio diproses sepenuhnya di memori; set DEBUG_AUDIO_DUMP=1 untuk tetap menyimpan salinan WAV.
+DEBUG_AUDIO_DUMP = os.getenv("DEBUG_AUDIO_DUMP", "0") == "1"
+
 # Buat direktori jika belum ada
-if not os.path.exists('uploads'):
-    os.makedirs('uploads')
-if not os.path.exists('outputs'):
-    os.makedirs('outputs')
+if DEBUG_AUDIO_DUMP:
+    os.makedirs('uploads', exist_ok=True)
+    os.makedirs('outputs', exist_ok=True)
+
+
+def dump_debug_audio(directory: str, prefix: str, wav_bytes: bytes):
+    if not DEBUG_AUDIO_DUMP or not wav_bytes:
+        return
+    # Nama unik per permintaan supaya permintaan paralel tidak saling menimpa.
+    path = os.path.join(directory, f"{prefix}_{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}.wav")
+    with open(path, 'wb') as f:
+        f.write(wav_bytes)
+
+# Modul yang baru dimuat saat pertama kali dibutuhkan, mis. LAZY_MODULES="tts,stt".
+LAZY_MODULES = {name.strip() for name in os.getenv("LAZY_MODULES", "").split(",") if name.strip()}
+modules = build_modules(lazy=LAZY_MODULES)
+# Setiap model punya worker dan antrean sendiri alih-alih berebut threadpool generik FastAPI.
+scheduler = build_scheduler(modules)
+# Teks TTS hingga panjang ini dianggap interaktif; yang lebih panjang mengalah pada permintaan pendek.
+TTS_INTERACTIVE_CHARS = int(os.getenv("TTS_INTERACTIVE_CHARS", "200"))
+# /api/assistant?stream=true membacakan kalimat final_answer selagi Gemini masih menulis sisanya.
+DIALOGUE_STREAM = os.getenv("DIALOGUE_STREAM", "1") == "1"
+
+
+def tts_priority(text: str) -> int:
+    return INTERACTIVE if len(text) <= TTS_INTERACTIVE_CHARS else BULK
+
+
+async def schedule(model: str, fn, *args, priority: int = INTERACTIVE, **kwargs):
+    try:
+        return await scheduler.run(model, fn, *args, priority=priority, **kwargs)
+    except SchedulerBusy as e:
+        # Antrean penuh ditolak cepat (429); tenggat yang lewat saat antre berarti server kewalahan (503).
+        raise HTTPException(
+            status_code=503 if e.reason == "deadline" else 429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+@app.exception_handler(ModuleNotReady)
+async def module_not_ready_handler(request, exc: ModuleNotReady):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "module": exc.name, "state": exc.state},
+        headers={"Retry-After": "2"}
+    )
+
+
+# Trace id dari klien hanya diterima bila formatnya wajar; selain itu dibuat baru.
+_TRACE_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def _route_template(scope) -> str:
+    # Template rute (mis. /api/jobs/{job_id}) menjaga kardinalitas label metrik tetap kecil.
+    for route in app.router.routes:
+        if route.matches(scope)[0] == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+def _start_trace(headers) -> telemetry.Trace:
+    incoming = headers.get(telemetry.TRACE_HEADER, "")
+    return telemetry.start_trace(incoming if _TRACE_ID.match(incoming) else None)
+
+
+@app.middleware("http")
+async def trace_requests(request, call_next):
+    trace = _start_trace(request.headers)
+    started = time.perf_counter()
+    response = await call_next(request)
+    response.headers[telemetry.TRACE_HEADER] = trace.trace_id
+    body_iterator = response.body_iterator
+
+    async def finish_when_sent():
+        # Untuk respons streaming, durasi dan trace baru lengkap setelah body terakhir terkirim.
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            path = _route_template(request.scope)
+            telemetry.REQUEST_SECONDS.observe(time.perf_counter() - started, path=path, status=str(response.status_code))
+            if trace.spans:
+                trace.attributes.update({"path": path, "status": response.status_code})
+                telemetry.finish_trace(trace)
+
+    response.body_iterator = finish_when_sent()
+    return response
 
-modules: Dict[str, object] = {}
 
 @app.on_event("startup")
 async def startup_event():
-    print("--- Memuat Model AI... ---")
-    modules["stt"] = SpeechToText(model_size="base")
-    modules["dialogue_manager"] = DialogueManager()
-    modules["action_executor"] = ActionExecutor()
-    modules["tts"] = TextToSpeech()
-    print("--- Inisialisasi Selesai. Server Siap. ---")
+    # Model dimuat paralel di latar belakang; server langsung melayani endpoint yang modulnya siap.
+    print("--- Memuat Model AI di latar belakang... ---")
+    modules.start()
+
+
+@app.get("/health", summary="Liveness dan status tiap modul")
+async def health():
+    return {"status": "ok", "modules": modules.status()}
+
+
+@app.get("/ready", summary="Kesiapan server untuk melayani permintaan")
+async def ready():
+    eager = [name for name, info in modules.status().items() if not info["lazy"]]
+    body = {
+        "ready": modules.is_ready(*eager),
+        "text_ready": modules.is_ready(*TEXT_MODULES),
+        "modules": modules.status(),
+    }
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
+
+
+@app.get("/api/scheduler", summary="Kedalaman antrean, waktu tunggu, dan penolakan per model")
+async def scheduler_stats():
+    return scheduler.stats()
+
+
+@app.get("/metrics", summary="Metrik latensi dan throughput dalam format Prometheus")
+async def prometheus_metrics():
+    return Response(content=telemetry.metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ClientTimingsRequest(BaseModel):
+    # Nama tahap klien -> detik, mis. {"record": 3.2, "playback": 2.1}.
+    stages: Dict[str, float]
+
+
+@app.post("/api/traces/client", summary="Mencatat durasi tahap di sisi klien untuk trace yang sama")
+async def client_timings(request: ClientTimingsRequest):
+    for name, seconds in request.stages.items():
+        if re.fullmatch(r"[a-z_]{1,32}", name) and 0 <= seconds < 3600:
+            telemetry.record_stage(f"client_{name}", seconds)
+    return {"trace_id": telemetry.current_trace().trace_id}
 
 
 class ProcessTextRequest(BaseModel):
     text: str
+    session_id: str = "default"
 
 class SynthesizeRequest(BaseModel):
     text: str
 
+class NLURequest(BaseModel):
+    texts: List[str]
 
-@app.post("/api/transcribe", summary="Mentranskripsikan file audio")
-async def transcribe_audio(audio: UploadFile = File(...)):
+
+async def read_audio(request: Request, audio: Optional[UploadFile]) -> np.ndarray:
+    """Audio unggahan sebagai float32 mono 16 kHz.
+
+    Menerima multipart (WAV/FLAC/Ogg Opus) atau body mentah: PCM int16 dengan content-type
+    application/octet-stream/audio/L16 plus header X-Sample-Rate dan X-Channels, atau file terkompresi.
+    """
+    if audio is not None:
+        data = await audio.read()
+        # Bagian multipart tanpa tipe spesifik (mis. curl -F) dideteksi dari isinya, bukan dianggap PCM.
+        part_type = (audio.content_type or "").split(";")[0].strip().lower()
+        content_type = None if part_type == "application/octet-stream" else audio.content_type
+    else:
+        data = await request.body()
+        content_type = request.headers.get("content-type")
     try:
-        audio_bytes = await audio.read()
+        with telemetry.stage("decode_audio", upload_bytes=len(data)):
+            audio_data, source_rate = await run_in_threadpool(
+                decode_audio, data, content_type,
+                sample_rate=request.headers.get("X-Sample-Rate"), channels=request.headers.get("X-Channels")
+            )
+    except (AudioDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Audio tidak valid: {e}")
+    if DEBUG_AUDIO_DUMP:
+        buffer = io.BytesIO()
+        sf.write(buffer, audio_data, TARGET_SAMPLE_RATE, format='WAV', subtype='PCM_16')
+        dump_debug_audio('uploads', 'command', buffer.getvalue())
+    return audio_data
 
-        audio_data, samplerate = sf.read(io.BytesIO(audio_bytes))
 
-        transcribed_text = await run_in_threadpool(modules["stt"].transcribe, audio_data=audio_data)
+@app.post("/api/transcribe", summary="Mentranskripsikan file audio")
+async def transcribe_audio(request: Request, audio: Optional[UploadFile] = File(None)):
+    modules.ensure_ready("stt")
+    try:
+        audio_data = await read_audio(request, audio)
+
+        transcribed_text = await schedule("stt", modules["stt"].transcribe, audio_data=audio_data)
         
         return {"text": transcribed_text}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Terjadi error saat memproses audio: {str(e)}")
 
+@app.websocket("/ws/transcribe")
+async def transcribe_stream(websocket: WebSocket):
+    # Klien mengirim frame PCM int16 16 kHz mono sebagai pesan biner selama merekam,
+    # lalu pesan teks {"type": "end"} untuk meminta transkripsi final.
+    if not modules.is_ready("stt"):
+        try:
+            modules.ensure_ready("stt")
+        except ModuleNotReady as e:
+            # 1013: "try again later".
+            await websocket.close(code=1013, reason=str(e)[:120])
+            return
+    await websocket.accept()
+    trace = _start_trace(websocket.headers)
+    session = StreamingTranscriber(modules["stt"])
+    partial_task = None
+
+    async def send_partial():
+        # Hasil sementara boleh dilewati saat STT sibuk; transkripsi final tetap diprioritaskan.
+        try:
+            text = await scheduler.run("stt", session.transcribe_partial, priority=BULK)
+        except SchedulerBusy:
+            return
+        await websocket.send_json({"type": "partial", "text": text})
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes") is not None:
+                session.feed(message["bytes"])
+                if session.partial_due() and (partial_task is None or partial_task.done()):
+                    partial_task = asyncio.create_task(send_partial())
+            elif message.get("text") is not None:
+                if json.loads(message["text"]).get("type") == "end":
+                    break
+
+        if partial_task is not None:
+            await partial_task
+        final_text = await scheduler.run("stt", session.transcribe_final, priority=INTERACTIVE)
+        await websocket.send_json({"type": "final", "text": final_text, "duration": session.duration})
+        await websocket.close()
+    except SchedulerBusy as e:
+        await websocket.send_json({"type": "error", "detail": str(e), "retry_after": e.retry_after})
+        await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        if partial_task is not None:
+            partial_task.cancel()
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"Terjadi error saat memproses audio: {str(e)}"})
+        await websocket.close(code=1011)
+    finally:
+        trace.attributes.update({"path": "/ws/transcribe", "audio_seconds": round(session.duration, 2)})
+        telemetry.finish_trace(trace)
+
 @app.post("/api/process-text", summary="Memproses teks untuk mendapatkan respons")
 async def process_text(request: ProcessTextRequest):
+    modules.ensure_ready(*TEXT_MODULES)
     try:
-        def sync_pipeline(text: str):
-            dm_result = modules["dialogue_manager"].process(text)
-            
-            if dm_result['type'] == 'response':
-                return dm_result['message']
-            elif dm_result['type'] == 'action':
-                return modules["action_executor"].execute(dm_result['data'])
-            else:
-                return "Terjadi kesalahan pada alur logika."
-
-        response_message = await run_in_threadpool(sync_pipeline, text=request.text)
+        result = await schedule("dialogue", run_dialogue_pipeline, modules, text=request.text, session_id=request.session_id)
         
-        return {"response": response_message}
+        return {"response": result["message"], "route": result["route"], "job_id": result["job_id"]}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Terjadi error saat memproses teks: {str(e)}")
 
 
+@app.post("/api/nlu", summary="Intent dan entitas (NER) untuk satu atau banyak ucapan")
+async def extract_entities(request: NLURequest):
+    modules.ensure_ready("nlu")
+    try:
+        results = await schedule("nlu", modules["nlu"].process_many, request.texts)
+        return {"results": results, "cache": modules["nlu"].cache_stats()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Terjadi error saat memproses NLU: {str(e)}")
+
+
 @app.post("/api/synthesize", summary="Menghasilkan ucapan dari teks")
 async def synthesize_speech(request: SynthesizeRequest):
-    output_path = "outputs/response.wav"
+    modules.ensure_ready("tts")
     try:
-        await run_in_threadpool(modules["tts"].synthesize, text=request.text, output_path=output_path)
+        wav_bytes = await schedule("tts", modules["tts"].synthesize_to_bytes, text=request.text,
+                                   priority=tts_priority(request.text))
 
-        if os.path.exists(output_path):
-            return FileResponse(output_path, media_type='audio/wav', filename='response.wav')
-        else:
+        if not wav_bytes:
             raise HTTPException(status_code=500, detail="Gagal membuat file audio.")
+        dump_debug_audio('outputs', 'response', wav_bytes)
+        return Response(
+            content=wav_bytes,
+            media_type='audio/wav',
+            headers={"Content-Disposition": 'attachment; filename="response.wav"'}
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Terjadi error saat sintesis ucapan: {str(e)}")
 
+@app.get("/api/jobs/{job_id}", summary="Status dan hasil aksi yang berjalan di latar belakang")
+async def get_job(job_id: str):
+    modules.ensure_ready("action_jobs")
+    job = modules["action_jobs"].get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' tidak ditemukan.")
+    return job
+
+
+@app.get("/api/llm/cache", summary="Statistik cache keputusan dan jawaban LLM")
+async def llm_cache_stats():
+    modules.ensure_ready("dialogue_manager", "action_executor")
+    return {
+        "decisions": modules["dialogue_manager"].decision_cache.stats(),
+        "answers": modules["action_executor"].answer_cache.stats(),
+    }
+
+
+@app.get("/api/tts/cache", summary="Statistik cache audio TTS")
+async def tts_cache_stats():
+    modules.ensure_ready("tts")
+    return modules["tts"].audio_cache.stats()
+
+
+async def pcm_stream_response(text: str, headers: Dict[str, str] = None, more_sentences=None,
+                              admitted: bool = False) -> StreamingResponse:
+    # PCM int16 mono mentah dialirkan per potongan kalimat; klien membaca sample rate dari header.
+    # more_sentences: iterator sinkron kalimat lanjutan (mis. dari LLM streaming) yang dibacakan setelah `text`.
+    # admitted=True bila giliran ini sudah menjalankan dialog/aksi: menolak TTS saat itu membuat klien
+    # mengulang permintaan dan aksinya tereksekusi dua kali.
+    tts = modules["tts"]
+    stream = tts.synthesize_stream(text)
+    priority = tts_priority(text)
+    # Potongan pertama diminta sebelum header terkirim supaya antrean penuh masih bisa dijawab 429.
+    first_chunk = await schedule("tts", next, stream, None, priority=priority, admitted=admitted)
+
+    async def pcm_chunks():
+        # Tiap kalimat dijadwalkan terpisah: render panjang tidak memonopoli model, dan potongan
+        # lanjutan tidak ditolak di tengah respons yang sudah berjalan.
+        chunk, chunks = first_chunk, stream
+        while True:
+            while chunk is not None:
+                yield to_pcm16(chunk)
+                chunk = await scheduler.run("tts", next, chunks, None, priority=priority, admitted=True)
+            if more_sentences is None:
+                break
+            # Kalimat berikutnya biasanya sudah tertampung di stream LLM saat kalimat ini selesai disintesis.
+            sentence = await scheduler.run("dialogue", next, more_sentences, None, priority=INTERACTIVE, admitted=True)
+            if sentence is None:
+                break
+            chunks = tts.synthesize_stream(sentence, first_audio=False)
+            chunk = await scheduler.run("tts", next, chunks, None, priority=priority, admitted=True)
+
+    stream_headers = {"X-Sample-Rate": str(tts.sample_rate), "X-Channels": "1"}
+    stream_headers.update(headers or {})
+    return StreamingResponse(pcm_chunks(), media_type="audio/L16", headers=stream_headers)
+
+
+def streamed_sentences(events):
+    for kind, payload in events:
+        if kind == "sentence":
+            yield payload
+
+
+@app.post("/api/synthesize-stream", summary="Menghasilkan ucapan dari teks secara bertahap per kalimat")
+async def synthesize_speech_stream(request: SynthesizeRequest):
+    modules.ensure_ready("tts")
+    if not modules["tts"].tts:
+        raise HTTPException(status_code=503, detail="Model TTS tidak tersedia.")
+    return await pcm_stream_response(request.text)
+
+
+@app.post("/api/assistant", summary="Menjalankan STT, dialog, tindakan, dan TTS dalam satu permintaan")
+async def assistant(request: Request, audio: Optional[UploadFile] = File(None), stream: bool = False,
+                    session_id: str = "default"):
+    modules.ensure_ready("stt", *TEXT_MODULES, "tts")
+    try:
+        audio_data = await read_audio(request, audio)
+
+        transcribed_text = await schedule("stt", modules["stt"].transcribe, audio_data=audio_data)
+        if not transcribed_text or not transcribed_text.strip():
+            result = turn_result("", None)
+        elif stream and DIALOGUE_STREAM:
+            events = run_dialogue_pipeline_stream(modules, transcribed_text, session_id)
+            kind, payload = await schedule("dialogue", next, events)
+            if kind == "sentence":
+                # Teks jawaban lengkap belum ada saat header dikirim; audio menyusul per kalimat.
+                headers = {"X-Transcript": quote(transcribed_text), "X-Route": "llm", "X-Response-Streamed": "1"}
+                return await pcm_stream_response(payload, headers, more_sentences=streamed_sentences(events),
+                                                 admitted=True)
+            result = turn_result(transcribed_text, payload)
+        else:
+            dialogue = await schedule("dialogue", run_dialogue_pipeline, modules, transcribed_text, session_id)
+            result = turn_result(transcribed_text, dialogue)
+
+        if stream:
+            headers = {
+                "X-Transcript": quote(result["text"]),
+                "X-Response-Text": quote(result["response"] or ""),
+                "X-Route": result["route"] or "",
+            }
+            if result["job_id"]:
+                headers["X-Job-Id"] = result["job_id"]
+            if not result["response"]:
+                return Response(status_code=204, headers=headers)
+            return await pcm_stream_response(result["response"], headers, admitted=True)
+
+        # Dialog/aksi sudah berjalan; TTS tidak boleh ditolak lagi (lihat pcm_stream_response).
+        if result["response"]:
+            wav_bytes = await schedule("tts", modules["tts"].synthesize_to_bytes, result["response"],
+                                       priority=tts_priority(result["response"]), admitted=True)
+            dump_debug_audio('outputs', 'response', wav_bytes)
+        else:
+            wav_bytes = b""
+        result["audio"] = base64.b64encode(wav_bytes).decode("ascii") if wav_bytes else None
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Terjadi error pada alur asisten: {str(e)}")
+
 if __name__ == '__main__':
     uvicorn.run(app, host='127.0.0.1', port=5000)
\ No newline at end of file
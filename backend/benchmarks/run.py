@@ -0,0 +1,307 @@
+# backend/benchmarks/run.py
+"""Benchmark beban dan mikro-benchmark backend, dapat dijalankan tanpa jaringan.
+
+Jalankan dari folder backend:
+
+    python -m benchmarks.run                       # model tiruan, in-process
+    python -m benchmarks.run --real-models         # + mikro-benchmark Whisper/XTTS bila terpasang
+    python -m benchmarks.run --real-models --skip-load --tts-profiles cpu cpu-int8   # bandingkan profil XTTS
+    python -m benchmarks.run --url http://127.0.0.1:5000   # server yang sedang berjalan
+
+Hasil ditulis sebagai JSON ke benchmarks/results/ agar antar-run bisa dibandingkan.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import asyncio
+import platform
+import subprocess
+
+import numpy as np
+
+from benchmarks.stubs import (
+    StubSpeechToText, StubTextToSpeech, StubActionExecutor, SlowStubLLMClient, stub_llm_responses, sine_wav_bytes
+)
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+TEXT_PROMPTS = [
+    "halo apa kabar",
+    "berapa jarak bumi ke bulan?",
+    "putar lagu yang santai",
+    "buka notepad",
+    "atur volume ke 40",
+    "ceritakan lelucon singkat",
+    "siapa penemu telepon?",
+    "screenshot",
+]
+TTS_TEXTS = [
+    "Baik.",
+    "Tentu, ini jawaban singkat dari model tiruan.",
+    "Jarak rata-rata bumi ke bulan sekitar tiga ratus delapan puluh empat ribu kilometer. "
+    "Jarak itu berubah sedikit karena orbit bulan berbentuk elips.",
+]
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Persentil dengan interpolasi linear, sama seperti numpy.percentile bawaan."""
+    if not sorted_values:
+        return None
+    return float(np.percentile(sorted_values, q))
+
+
+def summarize(latencies: list, errors: int, wall_seconds: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(values) / wall_seconds, 3) if wall_seconds > 0 else None,
+        "mean_ms": round(1000 * float(np.mean(values)), 2) if values else None,
+        "p50_ms": round(1000 * percentile(values, 50), 2) if values else None,
+        "p95_ms": round(1000 * percentile(values, 95), 2) if values else None,
+        "p99_ms": round(1000 * percentile(values, 99), 2) if values else None,
+        "max_ms": round(1000 * values[-1], 2) if values else None,
+    }
+
+
+def install_stub_modules(modules, args):
+    """Mendaftarkan ulang modul berat di registry app.modules dengan pengganti deterministik."""
+    from ai_core.dialogue_manager import DialogueManager
+    from ai_core.intent_router import IntentRouter
+    from ai_core.action_jobs import ActionJobQueue
+    from ai_core.response_cache import ResponseCache
+
+    # TTL 0: setiap permintaan benar-benar melewati "LLM" kecuali --llm-cache diberikan.
+    decision_cache = ResponseCache() if args.llm_cache else ResponseCache(ttl_seconds=0)
+    llm = SlowStubLLMClient(latency=args.llm_latency, responses=stub_llm_responses)
+
+    modules.register("stt", lambda: StubSpeechToText(rtf=args.stt_rtf))
+    modules.register("intent_router", IntentRouter)
+    modules.register("dialogue_manager", lambda: DialogueManager(llm_client=llm, decision_cache=decision_cache))
+    modules.register("action_executor", lambda: StubActionExecutor())
+    modules.register("action_jobs", lambda: ActionJobQueue(modules.wait("action_executor")),
+                     depends_on=("action_executor",))
+    modules.register("tts", lambda: StubTextToSpeech(seconds_per_char=args.tts_seconds_per_char))
+
+
+def build_requests(endpoint: str, count: int, audio_seconds: float) -> list:
+    if endpoint == "/api/transcribe":
+        wav = sine_wav_bytes(audio_seconds)
+        return [{"files": {"audio": ("bench.wav", wav, "audio/wav")}} for _ in range(count)]
+    if endpoint == "/api/process-text":
+        return [{"json": {"text": TEXT_PROMPTS[i % len(TEXT_PROMPTS)], "session_id": f"bench-{i}"}}
+                for i in range(count)]
+    if endpoint == "/api/synthesize":
+        return [{"json": {"text": TTS_TEXTS[i % len(TTS_TEXTS)]}} for i in range(count)]
+    raise ValueError(f"Endpoint '{endpoint}' tidak didukung.")
+
+
+async def run_load(client, endpoint: str, payloads: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async def one(index: int, payload: dict):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    endpoint, headers={"X-Trace-Id": f"bench-{index}"}, timeout=120.0, **payload
+                )
+                status = response.status_code
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status == 200:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i, payload) for i, payload in enumerate(payloads)))
+    wall = time.perf_counter() - started
+    errors = len(payloads) - len(latencies)
+    result = summarize(latencies, errors, wall)
+    result.update({"endpoint": endpoint, "concurrency": concurrency, "wall_seconds": round(wall, 3), "statuses": statuses})
+    return result
+
+
+async def wait_until_ready(client, timeout: float = 600.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = await client.get("/ready")
+        if response.status_code == 200:
+            return
+        await asyncio.sleep(0.2)
+    raise TimeoutError("Backend tidak siap dalam batas waktu.")
+
+
+async def run_endpoints(args) -> list:
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url)
+        app = None
+    else:
+        from app import app, modules
+        install_stub_modules(modules, args)
+        await app.router.startup()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+
+    results = []
+    try:
+        await wait_until_ready(client)
+        for endpoint in args.endpoints:
+            payloads = build_requests(endpoint, args.warmup, args.audio_seconds)
+            await run_load(client, endpoint, payloads, args.concurrency)
+            for concurrency in args.concurrency_levels or [args.concurrency]:
+                payloads = build_requests(endpoint, args.requests, args.audio_seconds)
+                result = await run_load(client, endpoint, payloads, concurrency)
+                print(f"{endpoint:20s} c={concurrency:<3d} p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                      f"p99={result['p99_ms']}ms {result['throughput_rps']} req/s errors={result['errors']}")
+                results.append(result)
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+    return results
+
+
+def micro_stt(args) -> dict:
+    """RTF Whisper nyata per detik audio untuk beberapa durasi."""
+    from ai_core.stt import SpeechToText
+    stt = SpeechToText(model_size=args.stt_model)
+    stt.warmup()
+    rng = np.random.default_rng(0)
+    rows = []
+    for seconds in (1.0, 3.0, 5.0, 10.0):
+        audio = (0.01 * rng.standard_normal(int(seconds * 16000))).astype(np.float32)
+        timings = []
+        for _ in range(args.micro_repeats):
+            started = time.perf_counter()
+            stt.transcribe(audio)
+            timings.append(time.perf_counter() - started)
+        median = float(np.median(timings))
+        rows.append({"audio_seconds": seconds, "median_seconds": round(median, 4), "rtf": round(median / seconds, 4)})
+        print(f"STT {stt.backend.name} {seconds:4.1f}s audio: {median:.3f}s (RTF {median / seconds:.3f})")
+    return {"backend": stt.backend.name, "model": args.stt_model, "device": stt.device, "runs": rows}
+
+
+def micro_tts(args) -> dict:
+    """RTF XTTS nyata dan waktu-ke-audio-pertama untuk setiap profil inferensi (--tts-profiles)."""
+    from ai_core.tts import TextToSpeech
+    profiles = []
+    for name in args.tts_profiles or [None]:
+        # Model dimuat ulang per profil karena kuantisasi/kompilasi mengubah modul di tempat.
+        tts = TextToSpeech(profile=name)
+        if not tts.tts:
+            raise RuntimeError("Model TTS tidak tersedia.")
+        tts.warmup()
+        rows = []
+        for text in TTS_TEXTS:
+            timings, first_audio, audio_seconds = [], [], 0.0
+            for _ in range(args.micro_repeats):
+                started = time.perf_counter()
+                # _infer melewati cache audio supaya yang diukur memang inferensi.
+                wav = tts._infer(text)
+                timings.append(time.perf_counter() - started)
+                audio_seconds = len(wav) / tts.sample_rate
+                started = time.perf_counter()
+                stream = tts._stream_sentences(text)
+                next(stream, None)
+                first_audio.append(time.perf_counter() - started)
+                stream.close()
+            median = float(np.median(timings))
+            ttfa = float(np.median(first_audio))
+            rows.append({
+                "chars": len(text),
+                "median_seconds": round(median, 4),
+                "ms_per_char": round(1000 * median / len(text), 3),
+                "rtf": round(median / audio_seconds, 4) if audio_seconds else None,
+                "first_audio_seconds": round(ttfa, 4),
+            })
+            rtf = f"{median / audio_seconds:.3f}" if audio_seconds else "-"
+            print(f"TTS [{tts.profile['name']}] {len(text):4d} karakter: {median:.3f}s (RTF {rtf}, audio pertama {ttfa:.3f}s)")
+        profiles.append({"profile": tts.profile, "device": tts.device, "model": tts.model_name, "runs": rows})
+        del tts
+    return {"profiles": profiles}
+
+
+def run_micro(args) -> dict:
+    results = {}
+    for name, bench in (("stt", micro_stt), ("tts", micro_tts)):
+        try:
+            results[name] = bench(args)
+        except Exception as e:
+            # Model nyata bersifat opsional; catat alasannya alih-alih menggagalkan seluruh run.
+            print(f"Mikro-benchmark {name} dilewati: {e}")
+            results[name] = {"skipped": str(e)}
+    return results
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark backend asisten AI dengan model tiruan atau nyata.")
+    parser.add_argument("--url", help="Uji server yang sedang berjalan alih-alih app in-process dengan model tiruan.")
+    parser.add_argument("--endpoints", nargs="+",
+                        default=["/api/transcribe", "/api/process-text", "/api/synthesize"])
+    parser.add_argument("--requests", type=int, default=200, help="Jumlah permintaan per endpoint per level.")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--concurrency-levels", type=int, nargs="+",
+                        help="Sapu beberapa level konkurensi, mis. 1 4 16.")
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--stt-rtf", type=float, default=0.1, help="RTF Whisper tiruan.")
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="Latensi Gemini tiruan (detik).")
+    parser.add_argument("--tts-seconds-per-char", type=float, default=0.002)
+    parser.add_argument("--llm-cache", action="store_true", help="Aktifkan cache keputusan LLM selama benchmark.")
+    parser.add_argument("--real-models", action="store_true", help="Jalankan mikro-benchmark Whisper/XTTS nyata.")
+    parser.add_argument("--skip-load", action="store_true", help="Lewati uji beban endpoint.")
+    parser.add_argument("--stt-model", default="base")
+    parser.add_argument("--micro-repeats", type=int, default=3)
+    parser.add_argument("--tts-profiles", nargs="+",
+                        help="Profil inferensi XTTS yang dibandingkan, mis. cpu cpu-int8 (bawaan: TTS_PROFILE).")
+    parser.add_argument("--output", help="Path file JSON hasil (bawaan: benchmarks/results/<waktu>.json).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "mode": "remote" if args.url else "stub",
+    }
+    if not args.skip_load:
+        report["load"] = asyncio.run(run_endpoints(args))
+    if args.real_models:
+        report["micro"] = run_micro(args)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Hasil benchmark disimpan di {output}")
+    return report
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
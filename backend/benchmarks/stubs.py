@@ -0,0 +1,134 @@
+# backend/benchmarks/stubs.py
+
+import io
+import time
+import numpy as np
+import soundfile as sf
+
+from ai_core import telemetry
+from ai_core.llm_client import StubLLMClient
+from ai_core.tts_cache import AudioCache
+
+
+class StubSpeechToText:
+    """Pengganti Whisper yang deterministik: latensi sebanding durasi audio (rtf) dan teks tetap."""
+
+    device = "cpu"
+    supports_batching = False
+
+    def __init__(self, rtf: float = 0.1, text: str = "berapa jarak bumi ke bulan", sample_rate: int = 16000):
+        self.rtf = rtf
+        self.text = text
+        self.sample_rate = sample_rate
+
+    def warmup(self):
+        pass
+
+    def transcribe(self, audio_data: np.ndarray) -> str:
+        audio_seconds = len(audio_data) / self.sample_rate
+        with telemetry.stage("stt", backend="stub", audio_seconds=round(audio_seconds, 2)):
+            time.sleep(audio_seconds * self.rtf)
+        telemetry.observe_audio("stt", audio_seconds, audio_seconds * self.rtf)
+        return self.text
+
+    def transcribe_batch(self, audios: list) -> list:
+        return [self.transcribe(audio) for audio in audios]
+
+
+class StubTextToSpeech:
+    """Pengganti XTTS: waktu sintesis per karakter tetap, keluaran berupa nada sinus."""
+
+    tts = True
+    language = "en"
+
+    def __init__(self, seconds_per_char: float = 0.002, sample_rate: int = 24000, audio_seconds_per_char: float = 0.06):
+        self.seconds_per_char = seconds_per_char
+        self._sample_rate = sample_rate
+        self.audio_seconds_per_char = audio_seconds_per_char
+        # Cache in-memory saja supaya /api/tts/cache tetap berfungsi tanpa menyentuh disk.
+        self.audio_cache = AudioCache(None, max_disk_bytes=0)
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    def warmup(self):
+        pass
+
+    def _render(self, text: str) -> np.ndarray:
+        with telemetry.stage("tts_infer", chars=len(text)):
+            time.sleep(len(text) * self.seconds_per_char)
+            samples = int(len(text) * self.audio_seconds_per_char * self._sample_rate)
+            t = np.arange(samples, dtype=np.float32) / self._sample_rate
+            wav = (0.1 * np.sin(2 * np.pi * 220.0 * t)).astype(np.float32)
+        telemetry.observe_audio("tts", samples / self._sample_rate, len(text) * self.seconds_per_char)
+        return wav
+
+    def synthesize_stream(self, text: str, first_audio: bool = True):
+        from ai_core.tts import split_sentences
+        for sentence in split_sentences(text):
+            yield self._render(sentence)
+
+    def synthesize_to_bytes(self, text: str) -> bytes:
+        buffer = io.BytesIO()
+        sf.write(buffer, self._render(text), self._sample_rate, format="WAV", subtype="PCM_16")
+        return buffer.getvalue()
+
+
+class StubActionExecutor:
+    """Mengembalikan pesan aksi tanpa menyentuh OS, browser, atau jaringan."""
+
+    def __init__(self, latency: float = 0.005):
+        from ai_core.response_cache import ResponseCache
+        self.latency = latency
+        self.answer_cache = ResponseCache(ttl_seconds=0)
+
+    def execute(self, action_object: dict) -> str:
+        return self.run(action_object)[0]
+
+    def run(self, action_object: dict) -> tuple:
+        with telemetry.stage("action", action=action_object.get("action")):
+            time.sleep(self.latency)
+        return f"Aksi {action_object.get('action')} selesai (stub).", True
+
+    def describe_pending(self, action_object: dict) -> str:
+        return f"Baik, menjalankan {action_object.get('action')} (stub)."
+
+
+class SlowStubLLMClient(StubLLMClient):
+    """StubLLMClient dengan latensi jaringan tiruan agar antrean dan konkurensi terlihat realistis."""
+
+    name = "stub-slow"
+
+    def __init__(self, latency: float = 0.4, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+
+    def generate(self, prompt: str) -> str:
+        time.sleep(self.latency)
+        return super().generate(prompt)
+
+    def generate_stream(self, prompt: str):
+        # Latensi total sama dengan generate(), tetapi tersebar per potongan seperti token Gemini.
+        text = super().generate(prompt)
+        chunks = [text[start:start + self.chunk_chars] for start in range(0, len(text), self.chunk_chars)]
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield chunk
+
+
+def stub_llm_responses(prompt: str) -> str:
+    # Keputusan bergantung pada giliran terakhir supaya beban campuran aksi/jawaban tetap deterministik.
+    last_turn = prompt.rsplit("user:", 1)[-1].lower()
+    if "putar" in last_turn or "mainkan" in last_turn:
+        return '{"tool_call": {"name": "play_spotify", "parameters": {"track_name": "lagu santai"}}}'
+    if "?" in last_turn or "berapa" in last_turn or "siapa" in last_turn:
+        return '{"tool_call": {"name": "information_retrieval", "parameters": {"question": "pertanyaan"}}}'
+    return '{"final_answer": "Tentu, ini jawaban singkat dari model tiruan."}'
+
+
+def sine_wav_bytes(seconds: float, sample_rate: int = 16000, frequency: float = 440.0) -> bytes:
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    buffer = io.BytesIO()
+    sf.write(buffer, 0.2 * np.sin(2 * np.pi * frequency * t), sample_rate, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
@@ -0,0 +1,103 @@
+# backend/tests/test_llm_stream.py
+
+import json
+
+from ai_core.dialogue_manager import DialogueManager
+from ai_core.llm_client import StubLLMClient
+from ai_core.llm_stream import DecisionStreamParser, SentenceStream
+from ai_core.response_cache import ResponseCache
+
+
+def feed_all(parser: DecisionStreamParser, text: str, chunk_chars: int = 3) -> str:
+    return "".join(parser.feed(text[i:i + chunk_chars]) for i in range(0, len(text), chunk_chars))
+
+
+def make_manager(response: str, chunk_chars: int = 5, cache: ResponseCache = None):
+    llm = StubLLMClient(default=response, chunk_chars=chunk_chars)
+    manager = DialogueManager(llm_client=llm, decision_cache=cache or ResponseCache(ttl_seconds=0))
+    return manager, llm
+
+
+def test_parser_strips_code_fence():
+    parser = DecisionStreamParser()
+    decoded = feed_all(parser, '```json\n{"final_answer": "Halo dunia."}\n```')
+    assert decoded == "Halo dunia."
+    assert parser.complete
+    assert parser.result() == {"final_answer": "Halo dunia."}
+
+
+def test_parser_decodes_escapes_split_across_chunks():
+    answer = 'Kata "kutip", garis\\miring\nbaris baru, é dan 😀.'
+    raw = json.dumps({"final_answer": answer})
+    for chunk_chars in (1, 2, 7):
+        parser = DecisionStreamParser()
+        assert feed_all(parser, raw, chunk_chars) == answer
+        assert parser.result()["final_answer"] == answer
+
+
+def test_parser_completes_tool_call_before_trailing_text():
+    parser = DecisionStreamParser()
+    decision = {"tool_call": {"name": "open_app", "parameters": {"app_name": "notepad"}}}
+    decoded = feed_all(parser, json.dumps(decision) + "\nCatatan tambahan yang bukan JSON")
+    assert decoded == ""
+    assert parser.complete
+    assert parser.result() == decision
+
+
+def test_sentence_stream_splits_and_flushes():
+    sentences = SentenceStream(max_chars=40)
+    emitted = []
+    for piece in ("Halo. Apa kab", "ar? Ini kalimat ", "terakhir"):
+        emitted.extend(sentences.feed(piece))
+    assert emitted == ["Halo.", "Apa kabar?"]
+    assert sentences.flush() == ["Ini kalimat terakhir"]
+    assert sentences.flush() == []
+
+
+def test_sentence_stream_cuts_long_sentences_at_clause():
+    sentences = SentenceStream(max_chars=40)
+    emitted = sentences.feed("Bagian pertama yang cukup panjang, lalu bagian kedua tanpa titik")
+    assert emitted == ["Bagian pertama yang cukup panjang,"]
+    assert sentences.flush() == ["lalu bagian kedua tanpa titik"]
+
+
+def test_process_stream_yields_sentences_then_result():
+    manager, _ = make_manager('```json\n{"final_answer": "Kalimat pertama. Kalimat \\"kedua\\"."}\n```')
+    events = list(manager.process_stream("ceritakan sesuatu"))
+    assert events[:-1] == [("sentence", "Kalimat pertama."), ("sentence", 'Kalimat "kedua".')]
+    kind, result = events[-1]
+    assert kind == "result"
+    assert result["type"] == "response"
+    assert result["message"] == 'Kalimat pertama. Kalimat "kedua".'
+
+
+def test_process_stream_tool_call_stops_at_closing_brace():
+    decision = {"tool_call": {"name": "open_app", "parameters": {"app_name": "notepad"}}}
+    manager, _ = make_manager(json.dumps(decision) + " teks sisa yang tidak dibaca")
+    events = list(manager.process_stream("tolong buka notepad"))
+    assert events == [("result", {"type": "action", "data": {"action": "open_app", "parameters": {"app_name": "notepad"}},
+                                  "cached": False})]
+
+
+def test_process_stream_cached_decision_is_single_result():
+    cache = ResponseCache()
+    manager, llm = make_manager('{"final_answer": "Jawaban. Dua kalimat."}', cache=cache)
+    first = list(manager.process_stream("berapa jarak bumi ke bulan", session_id="a"))
+    assert [kind for kind, _ in first] == ["sentence", "sentence", "result"]
+
+    second = list(manager.process_stream("berapa jarak bumi ke bulan", session_id="b"))
+    assert len(llm.calls) == 1
+    assert len(second) == 1
+    kind, result = second[0]
+    assert kind == "result"
+    assert result["message"] == "Jawaban. Dua kalimat."
+    assert result["cached"] is True
+
+
+def test_process_stream_invalid_output_falls_back_to_single_result():
+    manager, _ = make_manager("bukan JSON sama sekali")
+    events = list(manager.process_stream("halo"))
+    assert len(events) == 1
+    kind, result = events[0]
+    assert kind == "result"
+    assert result["type"] == "response"
@@ -0,0 +1,48 @@
+# backend/tests/test_response_cache.py
+
+import json
+
+from ai_core.dialogue_manager import DialogueManager
+from ai_core.llm_client import StubLLMClient
+from ai_core.response_cache import ResponseCache, history_fingerprint
+
+
+def make_manager():
+    llm = StubLLMClient(responses={
+        "buka notepad?": json.dumps({"tool_call": {"name": "open_app", "parameters": {"app_name": "notepad"}}}),
+        "putar musik?": json.dumps({"tool_call": {"name": "play_spotify", "parameters": {"track_name": "santai"}}}),
+    })
+    return DialogueManager(llm_client=llm, decision_cache=ResponseCache()), llm
+
+
+def test_short_reply_after_different_prompts_misses_cache():
+    manager, llm = make_manager()
+    manager.remember("bosan nih", "Mau saya buka notepad?", session_id="a")
+    manager.remember("bosan nih", "Mau saya putar musik?", session_id="b")
+
+    first = manager.process("ya", session_id="a")
+    second = manager.process("ya", session_id="b")
+
+    assert len(llm.calls) == 2
+    assert first["data"]["action"] == "open_app"
+    assert second["data"]["action"] == "play_spotify"
+    assert second["cached"] is False
+
+
+def test_short_reply_after_same_prompt_hits_cache():
+    manager, llm = make_manager()
+    for session_id in ("a", "b"):
+        manager.remember("bosan nih", "Mau saya buka notepad?", session_id=session_id)
+
+    manager.process("ya", session_id="a")
+    second = manager.process("ya", session_id="b")
+
+    assert len(llm.calls) == 1
+    assert second["cached"] is True
+
+
+def test_fingerprint_empty_only_at_session_start():
+    assert history_fingerprint("ya", []) == ""
+    assert history_fingerprint("ya", [("assistant", "Mau saya buka notepad?")]) != ""
+    assert (history_fingerprint("yang kedua", [("user", "x"), ("assistant", "Pilih satu atau dua?")])
+            != history_fingerprint("yang kedua", [("user", "x"), ("assistant", "Pilih tiga atau empat?")]))
@@ -1,118 +1,351 @@
 # run_assistant.py
 
 import os
-import struct
+import sys
 import pvporcupine
 import pyaudio
 import sounddevice as sd
 import soundfile as sf
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
+import io
+import base64
+import uuid
+from urllib.parse import unquote
 from dotenv import load_dotenv
 import numpy as np
 
-load_dotenv(dotenv_path=os.path.join('backend', '.env'))
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BASE_DIR, "backend")
+
+load_dotenv(dotenv_path=os.path.join(BACKEND_DIR, '.env'))
 
 PICOVOICE_ACCESS_KEY = os.getenv("PICOVOICE_ACCESS_KEY")
-WAKE_WORD_MODEL_PATH = "backend/Wake_word_model/halo-Kina_en_windows_v3_0_0.ppn" 
-BACKEND_URL = "http://127.0.0.1:5000"
+WAKE_WORD_MODEL_PATH = os.path.join(BACKEND_DIR, "Wake_word_model", "halo-Kina_en_windows_v3_0_0.ppn")
+BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:5000")
+# "auto": pakai server HTTP bila sudah berjalan, selain itu muat modul AI di proses ini ("embedded").
+ASSISTANT_MODE = os.getenv("ASSISTANT_MODE", "auto")
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
 SAMPLE_RATE = 16000
-RECORD_SECONDS = 5 
+# Perekaman berhenti setelah hening sepanjang VAD_END_SILENCE_MS, paling lama MAX_RECORD_SECONDS.
+MAX_RECORD_SECONDS = float(os.getenv("MAX_RECORD_SECONDS", "10"))
+VAD_END_SILENCE_MS = int(os.getenv("VAD_END_SILENCE_MS", "700"))
+# Batal bila tidak ada ucapan sama sekali dalam rentang ini setelah wake word.
+VAD_NO_SPEECH_TIMEOUT = float(os.getenv("VAD_NO_SPEECH_TIMEOUT", "4"))
+# Hening yang dibiarkan di awal/akhir setelah pemangkasan agar konsonan tidak terpotong.
+VAD_PADDING_MS = int(os.getenv("VAD_PADDING_MS", "200"))
+# "energy" (bawaan) atau "webrtc" (butuh paket webrtcvad; jatuh ke energy bila tidak ada).
+VAD_MODE = os.getenv("VAD_MODE", "energy")
+VAD_AGGRESSIVENESS = int(os.getenv("VAD_AGGRESSIVENESS", "2"))
+# Frame dianggap ucapan bila lebih keras VAD_ENERGY_MARGIN_DB dari derau latar, minimal VAD_MIN_ENERGY_DB dBFS.
+VAD_ENERGY_MARGIN_DB = float(os.getenv("VAD_ENERGY_MARGIN_DB", "10"))
+VAD_MIN_ENERGY_DB = float(os.getenv("VAD_MIN_ENERGY_DB", "-45"))
+# Putar jawaban sejak potongan audio pertama tiba alih-alih menunggu seluruh WAV.
+STREAM_TTS = os.getenv("STREAM_TTS", "1") == "1"
+# Audio tidak lagi ditulis ke disk; set DEBUG_SAVE_AUDIO=1 untuk menyimpan command.wav/response.wav.
+DEBUG_SAVE_AUDIO = os.getenv("DEBUG_SAVE_AUDIO", "0") == "1"
+# Trace id dikirim di setiap panggilan backend agar tahap klien dan server bisa digabungkan.
+TRACE_HEADER = "X-Trace-Id"
+# Audio sebelum wake word selesai terdeteksi yang ikut dikirim, supaya suku kata pertama tidak hilang.
+PRE_ROLL_SECONDS = float(os.getenv("PRE_ROLL_SECONDS", "0.3"))
+# Kapasitas ring buffer; harus muat pre-roll + perintah terpanjang.
+RING_BUFFER_SECONDS = 30
+NOTIFICATION_SAMPLE_RATE = 44100
+# Format unggahan perintah: "pcm" (int16 mentah, tanpa encode/decode), "flac" (lebih kecil, untuk jaringan), atau "wav".
+UPLOAD_FORMAT = os.getenv("UPLOAD_FORMAT", "pcm")
+
+
+class AudioRingBuffer:
+    """Ring buffer int16 yang dialokasikan sekali; posisi dihitung sebagai indeks sampel absolut."""
+
+    def __init__(self, capacity: int):
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.position = 0
+
+    def write(self, frame: np.ndarray):
+        start = self.position % self.capacity
+        end = start + frame.size
+        if end <= self.capacity:
+            self._buffer[start:end] = frame
+        else:
+            split = self.capacity - start
+            self._buffer[start:] = frame[:split]
+            self._buffer[:end - self.capacity] = frame[split:]
+        self.position += frame.size
+
+    def since(self, start_position: int) -> np.ndarray:
+        """Salinan kontigu sampel dari posisi absolut start_position hingga sekarang."""
+        start_position = max(start_position, self.position - self.capacity, 0)
+        if start_position >= self.position:
+            return np.empty(0, dtype=np.int16)
+        start = start_position % self.capacity
+        end = self.position % self.capacity
+        if start < end:
+            return self._buffer[start:end].copy()
+        return np.concatenate((self._buffer[start:], self._buffer[:end]))
+
+
+class VoiceActivityDetector:
+    """VAD per frame: ambang energi adaptif terhadap derau latar, atau WebRTC VAD bila tersedia."""
+
+    # WebRTC VAD hanya menerima frame 10/20/30 ms.
+    WEBRTC_FRAME_MS = 30
+
+    def __init__(self, sample_rate: int, mode: str = VAD_MODE):
+        self.sample_rate = sample_rate
+        self.noise_db = None
+        self._webrtc = None
+        if mode == "webrtc":
+            if webrtcvad is None:
+                print("Paket webrtcvad tidak terpasang, memakai VAD berbasis energi.")
+            else:
+                self._webrtc = webrtcvad.Vad(VAD_AGGRESSIVENESS)
+
+    @staticmethod
+    def frame_db(frame: np.ndarray) -> float:
+        samples = frame.astype(np.float32)
+        rms = np.sqrt(np.dot(samples, samples) / max(samples.size, 1))
+        return 20.0 * np.log10(rms / 32768.0 + 1e-10)
+
+    def calibrate(self, audio: np.ndarray, frame_length: int):
+        """Mengukur derau latar dari audio sebelum wake word (persentil bawah, mengabaikan ucapan)."""
+        usable = audio.size - audio.size % frame_length
+        if usable == 0:
+            return
+        frames = audio[:usable].reshape(-1, frame_length).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        self.noise_db = float(np.percentile(20.0 * np.log10(rms / 32768.0 + 1e-10), 20))
+
+    @property
+    def threshold_db(self) -> float:
+        if self.noise_db is None:
+            return VAD_MIN_ENERGY_DB
+        return max(VAD_MIN_ENERGY_DB, self.noise_db + VAD_ENERGY_MARGIN_DB)
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        if self._webrtc is not None:
+            step = self.sample_rate * self.WEBRTC_FRAME_MS // 1000
+            return any(
+                self._webrtc.is_speech(frame[i:i + step].tobytes(), self.sample_rate)
+                for i in range(0, frame.size - step + 1, step)
+            )
+        return self.frame_db(frame) > self.threshold_db
+
+
+def encode_upload(recording: np.ndarray):
+    """Body dan header unggahan: PCM mentah tanpa encode (bawaan) atau FLAC yang kira-kira separuh ukurannya."""
+    if UPLOAD_FORMAT == "flac":
+        buffer = io.BytesIO()
+        sf.write(buffer, recording, SAMPLE_RATE, format='FLAC', subtype='PCM_16')
+        return buffer.getvalue(), {"Content-Type": "audio/flac"}
+    if UPLOAD_FORMAT == "wav":
+        buffer = io.BytesIO()
+        sf.write(buffer, recording, SAMPLE_RATE, format='WAV', subtype='PCM_16')
+        return buffer.getvalue(), {"Content-Type": "audio/wav"}
+    return recording.astype("<i2", copy=False).tobytes(), {
+        "Content-Type": "application/octet-stream",
+        "X-Sample-Rate": str(SAMPLE_RATE),
+        "X-Channels": "1",
+    }
+
+
+def _notification_tone(samplerate: int = NOTIFICATION_SAMPLE_RATE, duration: float = 0.2, frequency: float = 880.0) -> np.ndarray:
+    t = np.linspace(0., duration, int(samplerate * duration), endpoint=False)
+    return (0.5 * np.sin(2. * np.pi * frequency * t)).astype(np.float32)
+
 
 class WakeWordListener:
-    def __init__(self):
+    def __init__(self, backend):
+        self.backend = backend
         self.porcupine = pvporcupine.create(
             access_key=PICOVOICE_ACCESS_KEY,
             keyword_paths=[WAKE_WORD_MODEL_PATH]
         )
+        self.frame_length = self.porcupine.frame_length
         self.pa = pyaudio.PyAudio()
+        # Satu stream input kontinu dipakai untuk wake word maupun perekaman perintah.
         self.audio_stream = self.pa.open(
             rate=self.porcupine.sample_rate,
             channels=1,
             format=pyaudio.paInt16,
             input=True,
-            frames_per_buffer=self.porcupine.frame_length
+            frames_per_buffer=self.frame_length
         )
+        self.ring = AudioRingBuffer(RING_BUFFER_SECONDS * self.porcupine.sample_rate)
+        self.notification_tone = _notification_tone()
+        self.vad = VoiceActivityDetector(self.porcupine.sample_rate)
         self.is_listening = True
 
+    def _read_frame(self) -> np.ndarray:
+        pcm = self.audio_stream.read(self.frame_length, exception_on_overflow=False)
+        # View tanpa salinan atas bytes dari PortAudio; Porcupine menerima array int16 langsung.
+        frame = np.frombuffer(pcm, dtype=np.int16)
+        self.ring.write(frame)
+        return frame
+
+    def _discard_pending_input(self):
+        # Audio yang menumpuk selama backend/pemutaran bukan bagian dari giliran berikutnya.
+        available = self.audio_stream.get_read_available()
+        if available:
+            self.audio_stream.read(available, exception_on_overflow=False)
+
     def listen(self):
         print("Pendengar 'halo Kina' aktif...")
         while self.is_listening:
-            pcm = self.audio_stream.read(self.porcupine.frame_length)
-            pcm = struct.unpack_from("h" * self.porcupine.frame_length, pcm)
-            
-            keyword_index = self.porcupine.process(pcm)
+            frame = self._read_frame()
+
+            detect_started = time.perf_counter()
+            keyword_index = self.porcupine.process(frame)
             if keyword_index >= 0:
                 print("'halo Kina' terdeteksi! Mulai merekam perintah...")
-                self.trigger_assistant()
+                self.trigger_assistant({"wake_word": time.perf_counter() - detect_started})
+                self._discard_pending_input()
 
-    def trigger_assistant(self):
+    def record_command(self) -> np.ndarray:
+        """Merekam dari stream yang sama hingga hening di akhir ucapan, lalu memangkas hening di kedua sisi.
+
+        Mengembalikan array kosong bila tidak ada ucapan sebelum VAD_NO_SPEECH_TIMEOUT.
+        """
+        rate = self.porcupine.sample_rate
+        trigger_position = self.ring.position
+        start_position = max(0, trigger_position - int(PRE_ROLL_SECONDS * rate))
+        max_position = trigger_position + int(MAX_RECORD_SECONDS * rate)
+        # Nada notifikasi ikut terekam mikrofon; frame selama nada tidak memulai atau mengakhiri ucapan.
+        tone_end = trigger_position + int(len(self.notification_tone) / NOTIFICATION_SAMPLE_RATE * rate)
+        end_silence = int(VAD_END_SILENCE_MS / 1000 * rate)
+        no_speech_limit = trigger_position + int(VAD_NO_SPEECH_TIMEOUT * rate)
+
+        background = self.ring.since(trigger_position - 2 * rate)
+        self.vad.calibrate(background[:background.size - (trigger_position - start_position)], self.frame_length)
+        # Ucapan di pre-roll bisa jadi ekor wake word; dipakai sebagai awal hanya bila ucapan berlanjut tanpa jeda.
+        pre_roll_speech = None
+        pre_roll = self.ring.since(start_position)
+        for offset in range(0, pre_roll.size - self.frame_length + 1, self.frame_length):
+            if self.vad.is_speech(pre_roll[offset:offset + self.frame_length]):
+                pre_roll_speech = start_position + offset
+                break
+
+        first_speech = last_speech_end = None
+        heard_speech = False
+        while self.ring.position < max_position:
+            frame = self._read_frame()
+            if self.ring.position <= tone_end:
+                continue
+            if self.vad.is_speech(frame):
+                if not heard_speech:
+                    frame_start = self.ring.position - frame.size
+                    continued = pre_roll_speech is not None and frame_start - tone_end < end_silence
+                    first_speech = pre_roll_speech if continued else frame_start
+                heard_speech = True
+                last_speech_end = self.ring.position
+            elif not heard_speech:
+                if self.ring.position >= no_speech_limit:
+                    return np.empty(0, dtype=np.int16)
+            elif self.ring.position - last_speech_end >= end_silence:
+                break
+
+        if not heard_speech:
+            return np.empty(0, dtype=np.int16)
+        padding = int(VAD_PADDING_MS / 1000 * rate)
+        trim_start = max(start_position, first_speech - padding)
+        trim_end = min(self.ring.position, last_speech_end + padding)
+        return self.ring.since(trim_start)[:trim_end - trim_start]
+
+    def trigger_assistant(self, timings: dict = None):
         print("Memicu asisten...")
-        
+        trace_id = uuid.uuid4().hex
+        timings = dict(timings or {})
+        turn_started = time.perf_counter()
+
         try:
-            samplerate = 44100  
-            duration = 0.2  
-            frequency = 880.0  
-            
-            t = np.linspace(0., duration, int(samplerate * duration), endpoint=False)
-            amplitude = 0.5
-            audio_data = amplitude * np.sin(2. * np.pi * frequency * t)
-            
-            sd.play(audio_data, samplerate, blocking=True)
+            # Tidak memblokir: perekaman berjalan bersamaan dengan nada notifikasi.
+            sd.play(self.notification_tone, NOTIFICATION_SAMPLE_RATE, blocking=False)
         except Exception as e:
             print(f"Gagal memainkan suara notifikasi: {e}")
-        
-        time.sleep(0.3)
+        timings["notify"] = time.perf_counter() - turn_started
+
+        print(f"Merekam hingga Anda selesai bicara (maks. {MAX_RECORD_SECONDS:g} detik)...")
+        stage_started = time.perf_counter()
+        recording = self.record_command()
+        timings["record"] = time.perf_counter() - stage_started
+        if recording.size == 0:
+            print("Tidak ada ucapan terdeteksi.")
+            print("\nKembali mendengarkan 'halo Kina'...")
+            return
 
-        print(f"Merekam selama {RECORD_SECONDS} detik...")
-        recording = sd.rec(int(RECORD_SECONDS * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1, dtype='int16')
-        sd.wait() 
-        
-        temp_audio_path = "command.wav"
-        sf.write(temp_audio_path, recording, SAMPLE_RATE, subtype='PCM_16')
-        print("Perekaman selesai.")
+        if DEBUG_SAVE_AUDIO:
+            sf.write(os.path.join(BASE_DIR, "command.wav"), recording, SAMPLE_RATE, subtype='PCM_16')
+        print(f"Perekaman selesai ({recording.size / SAMPLE_RATE:.1f} detik ucapan).")
 
         try:
-            print("Mengirim audio ke backend untuk transkripsi...")
-            with open(temp_audio_path, 'rb') as f:
-                files = {'audio': (temp_audio_path, f, 'audio/wav')}
-                response = requests.post(f"{BACKEND_URL}/api/transcribe", files=files)
-                response.raise_for_status()
-                transcribed_text = response.json().get('text')
-                print(f"Hasil Transkripsi: '{transcribed_text}'")
-
-            if not transcribed_text:
+            print(f"Mengirim audio ke backend ({self.backend.name}) untuk diproses...")
+            request_started = time.perf_counter()
+            turn = self.backend.assistant(recording, trace_id)
+            # STT + dialog (+ upload, dan seluruh TTS bila tidak streaming) sampai jawaban siap diputar.
+            timings["backend"] = time.perf_counter() - request_started
+
+            print(f"Hasil Transkripsi: '{turn['text']}'")
+            if not turn["text"]:
                 raise ValueError("Transkripsi gagal atau kosong.")
 
-            print("Mengirim teks ke backend untuk diproses...")
-            response = requests.post(f"{BACKEND_URL}/api/process-text", json={"text": transcribed_text})
-            response.raise_for_status()
-            assistant_response_text = response.json().get('response')
-            print(f"Respons Asisten: '{assistant_response_text}'")
-
-            print("Meminta backend untuk menghasilkan suara...")
-            response = requests.post(f"{BACKEND_URL}/api/synthesize", json={"text": assistant_response_text})
-            response.raise_for_status()
-            
-            response_audio_path = "response.wav"
-            with open(response_audio_path, 'wb') as f:
-                f.write(response.content)
-            
-            data, fs = sf.read(response_audio_path, dtype='float32')
-            sd.play(data, fs, blocking=True)
+            if turn["response"] is None and turn["chunks"] is not None:
+                # Jawaban LLM dibacakan per kalimat selagi masih ditulis; teks lengkapnya belum ada.
+                print(f"Respons Asisten ({turn['route']}): dibacakan bertahap...")
+            else:
+                print(f"Respons Asisten ({turn['route']}): '{turn['response']}'")
+
+            stage_started = time.perf_counter()
+            if turn["chunks"] is not None:
+                first_audio = self._play_pcm_chunks(turn["chunks"], turn["sample_rate"], turn["channels"])
+                if first_audio is not None:
+                    # Dari awal upload hingga suara pertama terdengar.
+                    timings["first_audio"] = first_audio - request_started
+            timings["playback"] = time.perf_counter() - stage_started
 
         except requests.exceptions.RequestException as e:
             print(f"Error komunikasi dengan backend: {e}")
         except Exception as e:
             print(f"Terjadi error pada alur asisten: {e}")
         finally:
-            if os.path.exists(temp_audio_path):
-                print(f"File audio sementara disimpan di: {temp_audio_path}") 
-            if os.path.exists("response.wav"):
-                os.remove("response.wav")
-            
+            timings["turn"] = time.perf_counter() - turn_started
+            print("Latensi (trace " + trace_id[:8] + "): " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+            self.backend.report_timings(trace_id, timings)
+            if DEBUG_SAVE_AUDIO:
+                print("File audio debug disimpan di: command.wav")
+
             print("\nKembali mendengarkan 'halo Kina'...")
 
+    def _play_pcm_chunks(self, chunks, samplerate: int, channels: int = 1):
+        """Memutar potongan PCM int16 saat tiba; mengembalikan waktu (perf_counter) potongan pertama diputar."""
+        frame_bytes = 2 * channels
+        leftover = b""
+        received = [] if DEBUG_SAVE_AUDIO else None
+        first_audio = None
+        with sd.RawOutputStream(samplerate=samplerate, channels=channels, dtype='int16') as out:
+            for chunk in chunks:
+                chunk = leftover + chunk
+                usable = len(chunk) - len(chunk) % frame_bytes
+                leftover = chunk[usable:]
+                if usable:
+                    if first_audio is None:
+                        first_audio = time.perf_counter()
+                    out.write(chunk[:usable])
+                    if received is not None:
+                        received.append(chunk[:usable])
+        if received:
+            pcm = np.frombuffer(b"".join(received), dtype='<i2').reshape(-1, channels)
+            sf.write(os.path.join(BASE_DIR, "response.wav"), pcm, samplerate, subtype='PCM_16')
+        return first_audio
 
     def stop(self):
         self.is_listening = False
@@ -122,11 +355,164 @@ class WakeWordListener:
             self.audio_stream.close()
         if self.pa:
             self.pa.terminate()
+        self.backend.close()
+
+
+class RemoteBackend:
+    """Backend FastAPI lewat HTTP dengan satu Session keep-alive, timeout, dan retry."""
+
+    name = "remote"
+
+    def __init__(self, base_url: str = BACKEND_URL):
+        self.base_url = base_url
+        self.session = requests.Session()
+        # Hanya GET yang diulang saat 429/503. POST /api/assistant bisa saja sudah menjalankan aksi sebelum
+        # ditolak, jadi tidak pernah diulang otomatis; kegagalan koneksi (sebelum permintaan terkirim) tetap diulang.
+        retry = Retry(
+            total=HTTP_RETRIES, connect=HTTP_RETRIES, read=0, status=HTTP_RETRIES,
+            backoff_factor=0.3, status_forcelist=(429, 503), allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True, raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def is_available(self) -> bool:
+        try:
+            return self.session.get(f"{self.base_url}/health", timeout=(HTTP_CONNECT_TIMEOUT, 2)).ok
+        except requests.exceptions.RequestException:
+            return False
+
+    def assistant(self, recording: np.ndarray, trace_id: str) -> dict:
+        body, upload_headers = encode_upload(recording)
+        response = self.session.post(
+            f"{self.base_url}/api/assistant",
+            data=body,
+            params={'stream': 'true'} if STREAM_TTS else None,
+            headers={TRACE_HEADER: trace_id, **upload_headers},
+            stream=STREAM_TTS,
+            timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        )
+        response.raise_for_status()
+
+        if STREAM_TTS:
+            return {
+                "text": unquote(response.headers.get('X-Transcript', '')),
+                "response": None if response.headers.get('X-Response-Streamed') == "1"
+                else unquote(response.headers.get('X-Response-Text', '')),
+                "route": response.headers.get('X-Route'),
+                "job_id": response.headers.get('X-Job-Id'),
+                "sample_rate": int(response.headers.get('X-Sample-Rate', 24000)),
+                "channels": int(response.headers.get('X-Channels', 1)),
+                "chunks": response.iter_content(chunk_size=4096) if response.status_code != 204 else None,
+            }
+
+        result = response.json()
+        turn = {key: result.get(key) for key in ("text", "response", "route", "job_id")}
+        turn.update({"sample_rate": None, "channels": 1, "chunks": None})
+        if result.get('audio'):
+            pcm, samplerate = sf.read(io.BytesIO(base64.b64decode(result['audio'])), dtype='int16')
+            turn.update({"sample_rate": samplerate, "channels": pcm.shape[1] if pcm.ndim > 1 else 1,
+                         "chunks": [pcm.tobytes()]})
+        return turn
+
+    def report_timings(self, trace_id: str, timings: dict):
+        try:
+            self.session.post(
+                f"{self.base_url}/api/traces/client",
+                json={"stages": timings},
+                headers={TRACE_HEADER: trace_id},
+                timeout=(HTTP_CONNECT_TIMEOUT, 2)
+            )
+        except requests.exceptions.RequestException as e:
+            print(f"Gagal mengirim metrik klien: {e}")
+
+    def close(self):
+        self.session.close()
+
+
+class EmbeddedBackend:
+    """Menjalankan modul ai_core langsung di proses ini: tanpa HTTP, audio tetap berupa array di memori."""
+
+    name = "embedded"
+
+    def __init__(self):
+        # Modul backend memakai path relatif (cache/, sampel suara), jadi dijalankan dari folder backend.
+        sys.path.insert(0, BACKEND_DIR)
+        os.chdir(BACKEND_DIR)
+        from ai_core import telemetry
+        from ai_core.pipeline import TEXT_MODULES, build_modules, run_dialogue_pipeline_stream, turn_result
+        from ai_core.tts import to_pcm16
+        self._telemetry = telemetry
+        self._dialogue_stream = run_dialogue_pipeline_stream
+        self._turn_result = turn_result
+        self._to_pcm16 = to_pcm16
+        self._trace = None
+
+        print("Memuat modul AI di dalam proses (mode embedded)...")
+        self.modules = build_modules()
+        self.modules.start()
+        for name in ("stt", *TEXT_MODULES, "tts"):
+            self.modules.wait(name)
+
+    def assistant(self, recording: np.ndarray, trace_id: str) -> dict:
+        self._trace = self._telemetry.start_trace(trace_id)
+        audio = np.multiply(recording, np.float32(1.0 / 32768.0), dtype=np.float32)
+        tts = self.modules["tts"]
+        text = self.modules["stt"].transcribe(audio_data=audio)
+        chunks = None
+        if not text or not text.strip():
+            result = self._turn_result("", None)
+        else:
+            events = self._dialogue_stream(self.modules, text, session_id="default")
+            kind, payload = next(events)
+            if kind == "sentence":
+                # Kalimat pertama final_answer sudah lengkap: mulai bicara selagi LLM menulis sisanya.
+                result = {"text": text, "response": None, "route": "llm", "job_id": None}
+                chunks = self._speak_stream(tts, payload, events) if tts.tts else None
+            else:
+                result = self._turn_result(text, payload)
+                if result["response"] and tts.tts:
+                    # Selalu dialirkan per kalimat: tidak ada biaya transport yang perlu dihemat dengan menunggu.
+                    chunks = (self._to_pcm16(chunk) for chunk in tts.synthesize_stream(result["response"]))
+        return {**result, "sample_rate": tts.sample_rate if tts.tts else None, "channels": 1, "chunks": chunks}
+
+    def _speak_stream(self, tts, first_sentence: str, events):
+        for chunk in tts.synthesize_stream(first_sentence):
+            yield self._to_pcm16(chunk)
+        for kind, payload in events:
+            if kind == "sentence":
+                for chunk in tts.synthesize_stream(payload, first_audio=False):
+                    yield self._to_pcm16(chunk)
+
+    def report_timings(self, trace_id: str, timings: dict):
+        trace = self._trace if self._trace is not None and self._trace.trace_id == trace_id else None
+        for name, seconds in timings.items():
+            self._telemetry.record_stage(f"client_{name}", seconds, trace=trace)
+        self._telemetry.finish_trace(trace)
+        self._trace = None
+
+    def close(self):
+        if self.modules.is_ready("action_jobs"):
+            self.modules["action_jobs"].shutdown()
+
+
+def create_backend():
+    """ASSISTANT_MODE: "auto" (HTTP bila server sudah berjalan, selain itu embedded), "remote", atau "embedded"."""
+    if ASSISTANT_MODE == "embedded":
+        return EmbeddedBackend()
+    remote = RemoteBackend()
+    if ASSISTANT_MODE == "remote" or remote.is_available():
+        return remote
+    print(f"Backend di {BACKEND_URL} tidak merespons; beralih ke mode embedded.")
+    remote.close()
+    return EmbeddedBackend()
+
 
 if __name__ == "__main__":
-    listener = WakeWordListener()
+    listener = WakeWordListener(create_backend())
     try:
         listener.listen()
     except KeyboardInterrupt:
         print("Menghentikan listener...")
-        listener.stop()
\ No newline at end of file
+        listener.stop()